@@ -0,0 +1,327 @@
+"""
+X-Amplify HTTP API
+Async JSON API exposing the generation pipeline to other services.
+
+Run with:
+    python api.py [--host 0.0.0.0] [--port 8080]
+
+Endpoints:
+    POST /generate   {"input": "..."}            -> thesis, posts and validation
+                     (?stream=1 streams NDJSON: thesis as soon as it is ready,
+                     then one event per format once all formats are generated)
+    POST /batch      {"inputs": ["...", ...]}    -> 202 with job ids
+    GET  /jobs/{id}                               -> job status and result
+    GET  /health                                  -> load and counters
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+from dotenv import load_dotenv
+
+from config.prompts import FORMAT_DISPLAY_NAMES
+from logic.engine import GeminiEngine, get_metrics, get_usage_report
+from logic.history import HistoryStore
+from logic.scraper import smart_input_parser
+from logic.validator import validate_all_posts
+
+# Pipelines running at once (each holds a worker thread while it waits on Gemini)
+MAX_CONCURRENT = 8
+
+# Requests allowed to wait for a slot; beyond this the API answers 429
+MAX_QUEUED = 32
+
+# Finished jobs kept for GET /jobs/{id}; oldest are dropped first
+MAX_JOBS = 1000
+
+MAX_BATCH_SIZE = 100
+
+# History store session id for runs generated through the API
+API_SESSION_ID = "api"
+
+
+class Saturated(Exception):
+    """Raised when the API has no room to queue another request."""
+
+
+class Limiter:
+    """
+    Admission control plus a concurrency cap.
+
+    `admit()` reserves a place (running or queued) or raises Saturated;
+    `async with limiter` then waits for a running slot and gives the
+    reservation back on exit.
+    """
+
+    def __init__(self, concurrency: int, queued: int):
+        self.capacity = concurrency + queued
+        self.admitted = 0
+        self.running = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def admit(self, count: int = 1) -> None:
+        if self.admitted + count > self.capacity:
+            raise Saturated()
+        self.admitted += count
+
+    def release(self) -> None:
+        self.admitted -= 1
+
+    async def __aenter__(self):
+        await self._semaphore.acquire()
+        self.running += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.running -= 1
+        self._semaphore.release()
+        self.release()
+
+
+def serialize_validation(posts: dict[str, str]) -> dict[str, dict]:
+    """Validation results as plain JSON-friendly dicts."""
+    return {
+        key: {"is_valid": result.is_valid, "issues": result.issues}
+        for key, result in validate_all_posts(posts).items()
+    }
+
+
+def run_pipeline(engine: GeminiEngine, history: HistoryStore, user_input: str) -> dict:
+    """Blocking end-to-end pipeline: parse input, extract thesis, generate posts."""
+    start = time.monotonic()
+    input_type, content = smart_input_parser(user_input)
+
+    step_start = time.monotonic()
+    thesis = engine.extract_thesis(content)
+    timings = {"thesis": round(time.monotonic() - step_start, 3)}
+
+    step_start = time.monotonic()
+    posts = engine.generate_all_formats(thesis)
+    timings["formats"] = round(time.monotonic() - step_start, 3)
+
+    run_id = history.save(API_SESSION_ID, thesis, posts, timings)
+    return {
+        "run_id": run_id,
+        "input_type": input_type,
+        "thesis": thesis,
+        "posts": posts,
+        "validation": serialize_validation(posts),
+        "seconds": round(time.monotonic() - start, 3),
+    }
+
+
+def too_busy() -> web.Response:
+    return web.json_response(
+        {"error": "Server is at capacity, retry later"},
+        status=429,
+        headers={"Retry-After": "5"},
+    )
+
+
+async def read_json(request: web.Request) -> dict:
+    try:
+        body = await request.json()
+    except (ValueError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be JSON"}),
+                                 content_type="application/json")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be a JSON object"}),
+                                 content_type="application/json")
+    return body
+
+
+def error_payload(e: Exception) -> dict:
+    return {"error": str(e), "type": type(e).__name__}
+
+
+class AmplifyAPI:
+    """Request handlers and shared state for the HTTP API."""
+
+    def __init__(self, concurrency: int = MAX_CONCURRENT, queued: int = MAX_QUEUED):
+        self.concurrency = concurrency
+        self.queued = queued
+        self.engine: GeminiEngine | None = None
+        self.history: HistoryStore | None = None
+        self.limiter: Limiter | None = None
+        self.executor = ThreadPoolExecutor(concurrency, thread_name_prefix="xamp-api")
+        self.jobs: OrderedDict[str, dict] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    async def on_startup(self, app: web.Application) -> None:
+        # Created here so the semaphore binds to the server's event loop
+        self.limiter = Limiter(self.concurrency, self.queued)
+        self.engine = GeminiEngine()
+        self.history = HistoryStore()
+
+    async def on_cleanup(self, app: web.Application) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_blocking(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        body = await read_json(request)
+        user_input = body.get("input")
+        if not isinstance(user_input, str) or not user_input.strip():
+            return web.json_response({"error": "'input' must be a non-empty string"}, status=400)
+        user_input = user_input.strip()
+
+        try:
+            self.limiter.admit()
+        except Saturated:
+            return too_busy()
+
+        if request.query.get("stream") in ("1", "true"):
+            return await self._generate_stream(request, user_input)
+
+        async with self.limiter:
+            try:
+                result = await self._run_blocking(run_pipeline, self.engine, self.history, user_input)
+            except Exception as e:
+                return web.json_response(error_payload(e), status=502)
+        return web.json_response(result)
+
+    async def _generate_stream(self, request: web.Request, user_input: str) -> web.StreamResponse:
+        """
+        Stream NDJSON events: input, thesis, one per format, then done.
+
+        The input and thesis events are sent as each step finishes. The
+        formats come from a single model call, so the per-format events are
+        all emitted together after that call (and any retries) completes.
+        """
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+
+        async def send(event: dict) -> None:
+            await response.write((json.dumps(event, ensure_ascii=False) + "\n").encode())
+
+        async with self.limiter:
+            await response.prepare(request)
+            try:
+                input_type, content = await self._run_blocking(smart_input_parser, user_input)
+                await send({"event": "input", "input_type": input_type})
+
+                step_start = time.monotonic()
+                thesis = await self._run_blocking(self.engine.extract_thesis, content)
+                timings = {"thesis": round(time.monotonic() - step_start, 3)}
+                await send({"event": "thesis", "thesis": thesis})
+
+                step_start = time.monotonic()
+                posts = await self._run_blocking(self.engine.generate_all_formats, thesis)
+                timings["formats"] = round(time.monotonic() - step_start, 3)
+                run_id = await self._run_blocking(
+                    self.history.save, API_SESSION_ID, thesis, posts, timings
+                )
+                validation = serialize_validation(posts)
+                for key in FORMAT_DISPLAY_NAMES:
+                    if key in posts:
+                        await send({
+                            "event": "post",
+                            "format": key,
+                            "content": posts[key],
+                            "validation": validation[key],
+                        })
+                await send({"event": "done", "run_id": run_id})
+            except Exception as e:
+                await send({"event": "error", **error_payload(e)})
+
+        await response.write_eof()
+        return response
+
+    async def batch(self, request: web.Request) -> web.Response:
+        body = await read_json(request)
+        inputs = body.get("inputs")
+        if not isinstance(inputs, list) or not inputs:
+            return web.json_response({"error": "'inputs' must be a non-empty list"}, status=400)
+        # A batch larger than the limiter's capacity could never be admitted
+        max_size = min(MAX_BATCH_SIZE, self.limiter.capacity)
+        if len(inputs) > max_size:
+            return web.json_response({"error": f"At most {max_size} inputs per batch"}, status=413)
+        for i, item in enumerate(inputs):
+            if not isinstance(item, str) or not item.strip():
+                return web.json_response(
+                    {"error": f"inputs[{i}] must be a non-empty string"}, status=400
+                )
+
+        inputs = [item.strip() for item in inputs]
+        try:
+            self.limiter.admit(len(inputs))
+        except Saturated:
+            return too_busy()
+
+        job_ids = []
+        for user_input in inputs:
+            job_id = uuid.uuid4().hex
+            self._store_job(job_id, {"id": job_id, "status": "queued", "input": user_input})
+            task = asyncio.create_task(self._run_job(job_id, user_input))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            job_ids.append(job_id)
+
+        return web.json_response({"jobs": job_ids}, status=202)
+
+    async def _run_job(self, job_id: str, user_input: str) -> None:
+        async with self.limiter:
+            self.jobs[job_id]["status"] = "running"
+            try:
+                result = await self._run_blocking(run_pipeline, self.engine, self.history, user_input)
+                self.jobs[job_id].update(status="done", result=result)
+            except Exception as e:
+                self.jobs[job_id].update(status="error", **error_payload(e))
+
+    def _store_job(self, job_id: str, job: dict) -> None:
+        self.jobs[job_id] = job
+        while len(self.jobs) > MAX_JOBS:
+            oldest_id, oldest = next(iter(self.jobs.items()))
+            if oldest["status"] in ("queued", "running"):
+                break
+            self.jobs.pop(oldest_id)
+
+    async def job_status(self, request: web.Request) -> web.Response:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            return web.json_response({"error": "Unknown job"}, status=404)
+        return web.json_response(job)
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "running": self.limiter.running,
+            "admitted": self.limiter.admitted,
+            "capacity": self.limiter.capacity,
+            "counters": get_metrics(),
+            "usage": get_usage_report(),
+        })
+
+
+def create_app(concurrency: int = MAX_CONCURRENT, queued: int = MAX_QUEUED) -> web.Application:
+    """Build the aiohttp application."""
+    api = AmplifyAPI(concurrency, queued)
+    app = web.Application()
+    app.on_startup.append(api.on_startup)
+    app.on_cleanup.append(api.on_cleanup)
+    app.router.add_post("/generate", api.generate)
+    app.router.add_post("/batch", api.batch)
+    app.router.add_get("/jobs/{job_id}", api.job_status)
+    app.router.add_get("/health", api.health)
+    return app
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Run the X-Amplify HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENT)
+    parser.add_argument("--queued", type=int, default=MAX_QUEUED)
+    args = parser.parse_args()
+
+    web.run_app(create_app(args.concurrency, args.queued), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
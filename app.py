@@ -3,14 +3,31 @@ X-Amplify: The Stijn Method Content Generator
 Main Streamlit application.
 """
 
+import time
+import uuid
+from collections import deque
+
 from dotenv import load_dotenv
 import streamlit as st
 from logic.scraper import smart_input_parser, is_valid_url
-from logic.engine import GeminiEngine, get_api_key
+from logic.engine import GeminiEngine, get_api_key, get_metrics
+from logic.usage import UsageLedger, get_budget
+from logic.history import HistoryStore, PayloadCache
+from logic.memory import session_memory, start_tracing, stop_tracing, top_allocations
 from config.prompts import FORMAT_DISPLAY_NAMES
 
 load_dotenv()
 
+# Only the newest debug entries are kept per session
+MAX_DEBUG_LOGS = 200
+
+# Generated results older than this (seconds) are dropped from memory and
+# served from the history store instead
+SESSION_PAYLOAD_TTL = 300
+
+# How often the background sweeper drops stale results, idle sessions included
+PAYLOAD_SWEEP_INTERVAL = 60
+
 # Page configuration
 st.set_page_config(
     page_title="X-Amplify | The Stijn Method",
@@ -27,40 +44,6 @@ st.markdown("""
         background: linear-gradient(135deg, #0a0a0a 0%, #1a1a2e 100%);
     }
     
-    /* Card styling */
-    .post-card {
-        background: rgba(255, 255, 255, 0.05);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-        border-radius: 12px;
-        padding: 1.5rem;
-        margin-bottom: 1rem;
-        backdrop-filter: blur(10px);
-        transition: all 0.3s ease;
-    }
-    
-    .post-card:hover {
-        border-color: rgba(99, 102, 241, 0.5);
-        transform: translateY(-2px);
-        box-shadow: 0 8px 32px rgba(99, 102, 241, 0.15);
-    }
-    
-    .post-header {
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #818cf8;
-        margin-bottom: 0.75rem;
-        padding-bottom: 0.5rem;
-        border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .post-content {
-        font-size: 0.95rem;
-        line-height: 1.6;
-        color: #e2e8f0;
-        white-space: pre-wrap;
-        font-family: 'Inter', system-ui, sans-serif;
-    }
-    
     /* Thesis display */
     .thesis-box {
         background: linear-gradient(135deg, rgba(99, 102, 241, 0.2) 0%, rgba(168, 85, 247, 0.2) 100%);
@@ -121,9 +104,69 @@ st.markdown("""
         -webkit-text-fill-color: transparent;
         font-weight: 800;
     }
+</style>
+""", unsafe_allow_html=True)
+
+
+# Styles for the post grid document (rendered in its own iframe, so the
+# page-level CSS above does not reach it)
+POST_GRID_CSS = """
+    body {
+        margin: 0;
+        background: transparent;
+        font-family: 'Inter', system-ui, -apple-system, 'Segoe UI', sans-serif;
+    }
+    
+    /* 2-column grid, single column on narrow screens */
+    .post-grid {
+        display: grid;
+        grid-template-columns: 1fr 1fr;
+        gap: 1rem;
+        padding: 4px;
+    }
+    
+    @media (max-width: 640px) {
+        .post-grid {
+            grid-template-columns: 1fr;
+        }
+    }
+    
+    /* Card styling */
+    .post-card {
+        background: rgba(255, 255, 255, 0.05);
+        border: 1px solid rgba(255, 255, 255, 0.1);
+        border-radius: 12px;
+        padding: 1.5rem;
+        backdrop-filter: blur(10px);
+        transition: all 0.3s ease;
+    }
+    
+    .post-card:hover {
+        border-color: rgba(99, 102, 241, 0.5);
+        transform: translateY(-2px);
+        box-shadow: 0 8px 32px rgba(99, 102, 241, 0.15);
+    }
+    
+    .post-header {
+        font-size: 1.1rem;
+        font-weight: 600;
+        color: #818cf8;
+        margin-bottom: 0.75rem;
+        padding-bottom: 0.5rem;
+        border-bottom: 1px solid rgba(255, 255, 255, 0.1);
+    }
+    
+    .post-content {
+        font-size: 0.95rem;
+        line-height: 1.6;
+        color: #e2e8f0;
+        white-space: pre-wrap;
+    }
     
     /* Copy button in card */
     .copy-btn {
+        width: 100%;
+        margin-top: 0.75rem;
         background: rgba(99, 102, 241, 0.2);
         border: 1px solid rgba(99, 102, 241, 0.3);
         color: #a78bfa;
@@ -137,8 +180,43 @@ st.markdown("""
     .copy-btn:hover {
         background: rgba(99, 102, 241, 0.4);
     }
-</style>
-""", unsafe_allow_html=True)
+    
+    .copy-btn.copied {
+        background: rgba(34, 197, 94, 0.25);
+        border-color: rgba(34, 197, 94, 0.5);
+        color: #86efac;
+    }
+"""
+
+# Client-side clipboard copy: no server round-trip per click
+POST_GRID_SCRIPT = """
+function copyPost(button) {
+    const text = button.parentElement.querySelector('.post-content').textContent;
+    const done = () => {
+        button.textContent = '✅ Copied!';
+        button.classList.add('copied');
+        setTimeout(() => {
+            button.textContent = '📋 Copy';
+            button.classList.remove('copied');
+        }, 1500);
+    };
+    if (navigator.clipboard && window.isSecureContext) {
+        navigator.clipboard.writeText(text).then(done, () => fallbackCopy(text, done));
+    } else {
+        fallbackCopy(text, done);
+    }
+}
+
+function fallbackCopy(text, done) {
+    const area = document.createElement('textarea');
+    area.value = text;
+    document.body.appendChild(area);
+    area.select();
+    document.execCommand('copy');
+    document.body.removeChild(area);
+    done();
+}
+"""
 
 
 def get_char_count_badge(content: str) -> str:
@@ -164,50 +242,127 @@ def safe_get_api_key() -> str | None:
         return None
 
 
-def render_post_card(format_key: str, content: str, col_index: int):
-    """Render a single post card with copy functionality."""
+def render_post_card(format_key: str, content: str) -> str:
+    """Return the HTML for a single post card with a client-side copy button."""
     display_name = FORMAT_DISPLAY_NAMES.get(format_key, format_key)
     char_badge = get_char_count_badge(content)
     
-    # Create unique key for this card's copy button
-    copy_key = f"copy_{format_key}_{col_index}"
-    
     # Escape content for HTML display
     import html
     escaped_content = html.escape(content)
     
-    st.markdown(f"""
+    return f"""
     <div class="post-card">
         <div class="post-header">{display_name} {char_badge}</div>
         <div class="post-content">{escaped_content}</div>
+        <button class="copy-btn" onclick="copyPost(this)">📋 Copy</button>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+
+def estimate_card_height(content: str) -> int:
+    """Rough pixel height of a card, used to size the grid iframe."""
+    import math
+
+    # ~55 chars per wrapped line at half width, ~24px per line
+    lines = sum(max(1, math.ceil(len(line) / 55)) for line in content.split("\n"))
+    return 150 + lines * 24
+
+
+@st.fragment
+def render_posts_grid(posts: dict[str, str]):
+    """
+    Render all post cards as one HTML block.
+    
+    Runs as a fragment and copies on the client, so interacting with the
+    cards never reruns the rest of the app.
+    """
+    format_keys = [key for key in FORMAT_DISPLAY_NAMES if key in posts]
+    cards = "".join(render_post_card(key, posts[key]) for key in format_keys)
+    
+    # Cards are laid out in rows of two
+    height = sum(
+        max(estimate_card_height(posts[key]) for key in format_keys[i:i + 2])
+        for i in range(0, len(format_keys), 2)
+    ) + 16 * (len(format_keys) // 2) + 16
     
-    # Copy button using Streamlit's native approach
-    if st.button("📋 Copy", key=copy_key, use_container_width=True):
-        st.session_state[f"copied_{format_key}"] = True
-        # JavaScript injection for clipboard - properly escape the content
-        escaped_js = content.replace('\\', '\\\\').replace('`', '\\`').replace('$', '\\$')
-        st.components.v1.html(f"""
-        <script>
-            navigator.clipboard.writeText(`{escaped_js}`);
-        </script>
-        """, height=0)
-        st.success("Copied!", icon="✅")
+    st.components.v1.html(f"""
+    <style>{POST_GRID_CSS}</style>
+    <div class="post-grid">{cards}</div>
+    <script>{POST_GRID_SCRIPT}</script>
+    """, height=height, scrolling=True)
+
+
+@st.fragment
+def render_export(posts: dict[str, str]):
+    """Render the export button (isolated so downloads don't rerun the app)."""
+    import json
+
+    json_str = json.dumps(posts, indent=2, ensure_ascii=False)
+    st.download_button(
+        label="📥 Export All as JSON",
+        data=json_str,
+        file_name="x_amplify_posts.json",
+        mime="application/json",
+        use_container_width=True,
+    )
 
 
 def log_debug(message: str) -> None:
-    """Append a debug message to session state with a short timestamp."""
+    """Append a debug message to the session's bounded log with a short timestamp."""
     from datetime import datetime
 
     timestamp = datetime.now().strftime("%H:%M:%S")
     entry = f"[{timestamp}] {message}"
-    st.session_state.setdefault("debug_logs", []).append(entry)
+    st.session_state.setdefault("debug_logs", deque(maxlen=MAX_DEBUG_LOGS)).append(entry)
+
+
+@st.cache_resource
+def get_history_store() -> HistoryStore:
+    """Process-wide history store shared by all sessions."""
+    return HistoryStore()
+
+
+@st.cache_resource
+def get_payload_cache() -> PayloadCache:
+    """Process-wide cache of every session's latest results, swept in the background."""
+    cache = PayloadCache(SESSION_PAYLOAD_TTL)
+    cache.start_sweeper(PAYLOAD_SWEEP_INTERVAL)
+    return cache
+
+
+def evict_stale_payloads() -> None:
+    """Drop results older than SESSION_PAYLOAD_TTL for all sessions; they stay in history."""
+    evicted = get_payload_cache().sweep()
+    if evicted:
+        log_debug(f"Evicted {evicted} stale result payload(s) to history.")
+
+
+def get_cached_results() -> tuple[str, dict[str, str]] | None:
+    """Return this session's (thesis, posts) if they are still held in memory."""
+    if "run_id" not in st.session_state:
+        return None
+    return get_payload_cache().get(st.session_state["session_id"], st.session_state["run_id"])
+
+
+def get_current_results() -> tuple[str | None, dict[str, str] | None]:
+    """Return (thesis, posts) from the payload cache, or from history if evicted."""
+    cached = get_cached_results()
+    if cached:
+        return cached
+    if "run_id" in st.session_state:
+        stored = get_history_store().load(st.session_state["run_id"])
+        if stored:
+            return stored
+    return (None, None)
 
 
 def main():
     """Main application logic."""
     
+    st.session_state.setdefault("session_id", uuid.uuid4().hex)
+    evict_stale_payloads()
+    
     # Header
     st.markdown("# ⚡ X-Amplify v1.1")
     st.markdown("*Transform any idea into 10 viral X posts using The Stijn Method*")
@@ -216,17 +371,39 @@ def main():
     with st.sidebar:
         st.header("🛠️ Debug Info")
         st.info(f"App Version: v1.1 (Debug Mode)")
-        if "thesis" in st.session_state:
+        if get_cached_results():
             st.success("State: Has Thesis")
+        elif "run_id" in st.session_state:
+            st.success("State: Thesis in History")
         else:
             st.warning("State: No Thesis")
             
         import sys
         st.text(f"Python: {sys.version.split()[0]}")
 
+        if "usage" in st.session_state:
+            st.markdown("**Session Usage**")
+            st.json(st.session_state["usage"].report(), expanded=False)
+
+        metrics = get_metrics()
+        if metrics:
+            st.markdown("**Model Counters**")
+            st.json(metrics)
+
+        memory = session_memory(st.session_state)
+        st.markdown(f"**Session Memory:** ~{sum(memory.values()) / 1024:.1f} KiB")
+        st.json({key: size for key, size in list(memory.items())[:5]}, expanded=False)
+
+        if st.toggle("Trace allocations (tracemalloc)", key="tracemalloc_enabled"):
+            start_tracing(st.session_state["session_id"])
+            st.caption("Process-wide; adds overhead while enabled.")
+            st.code("\n".join(top_allocations()) or "No allocations traced yet.")
+        else:
+            stop_tracing(st.session_state["session_id"])
+
         if st.session_state.get("debug_logs"):
             st.markdown("**Recent Logs**")
-            st.code("\n".join(st.session_state["debug_logs"][-12:]))
+            st.code("\n".join(list(st.session_state["debug_logs"])[-12:]))
     
     st.divider()
     
@@ -261,8 +438,8 @@ def main():
         """Callback to set generation state."""
         st.session_state['generating'] = True
         # Clear previous results
-        st.session_state.pop("posts", None)
-        st.session_state.pop("thesis", None)
+        get_payload_cache().pop(st.session_state["session_id"])
+        st.session_state.pop("run_id", None)
         log_debug("Generate button clicked. Starting new run.")
     
     with col2:
@@ -295,26 +472,32 @@ def main():
             # Generate posts
             status.write("🧠 Initialize Gemini Engine...")
             log_debug("Initializing Gemini engine.")
-            engine = GeminiEngine()
+            usage = st.session_state.setdefault("usage", UsageLedger())
+            engine = GeminiEngine(usage=usage, budget=get_budget())
             status.write(f"✅ Engine ready (Model: {engine.model})")
             log_debug(f"Gemini engine ready: {engine.model}.")
             
             status.write("⚡ Calling Gemini API (Extracting Thesis)...")
             log_debug("Calling Gemini API to extract thesis.")
             # We break down the call to show progress
+            step_start = time.monotonic()
             thesis = engine.extract_thesis(content)
+            timings = {"thesis": round(time.monotonic() - step_start, 3)}
             status.write("✅ Thesis extracted.")
             log_debug("Thesis extracted successfully.")
             
             status.write("🎨 Generating 10 Formats (this takes ~10s)...")
             log_debug("Generating all post formats.")
+            step_start = time.monotonic()
             posts = engine.generate_all_formats(thesis)
-            status.write("✅ Content generated!")
-            log_debug("All post formats generated.")
+            timings["formats"] = round(time.monotonic() - step_start, 3)
+            status.write(f"✅ Content generated! (Model: {engine.last_model})")
+            log_debug(f"All post formats generated. Counters: {dict(engine.counters)}")
             
-            # Store in session state
-            st.session_state["thesis"] = thesis
-            st.session_state["posts"] = posts
+            # Keep the results in memory for a while (and in history, for when they are evicted)
+            run_id = get_history_store().save(st.session_state["session_id"], thesis, posts, timings)
+            get_payload_cache().put(st.session_state["session_id"], run_id, thesis, posts)
+            st.session_state["run_id"] = run_id
             
             # Reset generation flag so we don't re-run on next interaction
             st.session_state['generating'] = False
@@ -350,13 +533,14 @@ def main():
             st.info(f"💡 **Tip:** {st.session_state['error_hint']}")
     
     # Display posts grid (also show thesis here if we have results but didn't just generate)
-    if "posts" in st.session_state and st.session_state["posts"]:
+    thesis, posts = get_current_results()
+    if posts:
         # Show thesis if we have it (persisted from previous generation)
-        if "thesis" in st.session_state:
+        if thesis:
             st.markdown(f"""
             <div class="thesis-box">
                 <div class="thesis-label">The Core Thesis</div>
-                <div class="thesis-text">"{st.session_state['thesis']}"</div>
+                <div class="thesis-text">"{thesis}"</div>
             </div>
             """, unsafe_allow_html=True)
         
@@ -364,37 +548,11 @@ def main():
         st.markdown("### 📱 Your 10 Posts")
         st.caption("Click copy to grab any post for X. Green = under 280 chars, Yellow = close, Red = over limit.")
         
-        posts = st.session_state["posts"]
-        
-        # Create 2-column grid for 10 cards
-        format_keys = list(FORMAT_DISPLAY_NAMES.keys())
-        
-        for i in range(0, 10, 2):
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                if i < len(format_keys):
-                    key = format_keys[i]
-                    if key in posts:
-                        render_post_card(key, posts[key], i)
-            
-            with col2:
-                if i + 1 < len(format_keys):
-                    key = format_keys[i + 1]
-                    if key in posts:
-                        render_post_card(key, posts[key], i + 1)
+        render_posts_grid(posts)
         
         # Export all button
         st.divider()
-        if st.button("📥 Export All as JSON", use_container_width=True):
-            import json
-            json_str = json.dumps(posts, indent=2, ensure_ascii=False)
-            st.download_button(
-                label="💾 Download JSON",
-                data=json_str,
-                file_name="x_amplify_posts.json",
-                mime="application/json",
-            )
+        render_export(posts)
 
 
 if __name__ == "__main__":
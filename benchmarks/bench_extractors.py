@@ -0,0 +1,98 @@
+"""
+Extractor Benchmark
+Compares speed and quality of the registered content extractors on a local
+corpus of saved HTML pages.
+
+Usage:
+    python -m benchmarks.bench_extractors path/to/corpus [--repeat 5]
+
+The corpus is a directory of `*.html` files. When a `<name>.txt` file sits
+next to `<name>.html` it is treated as the gold main text, and each extractor
+is scored with token-level precision, recall and F1 against it.
+"""
+
+import argparse
+import re
+import statistics
+import time
+from collections import Counter
+from pathlib import Path
+
+from logic.extractor import EXTRACTORS
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens used for quality scoring."""
+    return re.findall(r'\w+', text.lower())
+
+
+def token_scores(extracted: str, gold: str) -> tuple[float, float, float]:
+    """Return (precision, recall, f1) of extracted tokens against gold tokens."""
+    extracted_tokens = Counter(tokenize(extracted))
+    gold_tokens = Counter(tokenize(gold))
+    overlap = sum((extracted_tokens & gold_tokens).values())
+    if not overlap:
+        return (0.0, 0.0, 0.0)
+    precision = overlap / sum(extracted_tokens.values())
+    recall = overlap / sum(gold_tokens.values())
+    return (precision, recall, 2 * precision * recall / (precision + recall))
+
+
+def load_corpus(corpus_dir: Path) -> list[tuple[str, bytes, str | None]]:
+    """Load (name, raw_html, gold_text) triples from a corpus directory."""
+    pages = []
+    for html_path in sorted(corpus_dir.glob("*.html")):
+        gold_path = html_path.with_suffix(".txt")
+        gold = gold_path.read_text(encoding="utf-8") if gold_path.exists() else None
+        pages.append((html_path.stem, html_path.read_bytes(), gold))
+    return pages
+
+
+def run_benchmark(pages: list[tuple[str, bytes, str | None]], repeat: int) -> None:
+    """Time every extractor on every page and print a summary table."""
+    print(f"{'extractor':<14} {'median ms':>10} {'p95 ms':>8} {'chars':>8} "
+          f"{'precision':>9} {'recall':>7} {'f1':>6}")
+
+    for name, extractor in EXTRACTORS.items():
+        timings = []
+        chars = []
+        scores = []
+
+        for _, html, gold in pages:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text = extractor(html)
+                timings.append((time.perf_counter() - start) * 1000)
+            chars.append(len(text))
+            if gold is not None:
+                scores.append(token_scores(text, gold))
+
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        if scores:
+            precision, recall, f1 = (statistics.mean(col) for col in zip(*scores))
+            quality = f"{precision:>9.3f} {recall:>7.3f} {f1:>6.3f}"
+        else:
+            quality = f"{'-':>9} {'-':>7} {'-':>6}"
+
+        print(f"{name:<14} {statistics.median(timings):>10.2f} {p95:>8.2f} "
+              f"{statistics.mean(chars):>8.0f} {quality}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark content extractors.")
+    parser.add_argument("corpus", type=Path, help="Directory of saved *.html pages")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per page per extractor")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        raise SystemExit(f"No *.html files found in {args.corpus}")
+
+    gold_count = sum(1 for _, _, gold in pages if gold is not None)
+    print(f"Corpus: {len(pages)} pages ({gold_count} with gold text), repeat={args.repeat}")
+    run_benchmark(pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
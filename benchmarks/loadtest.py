@@ -0,0 +1,441 @@
+"""
+Concurrent-User Load Test
+Starts one real `streamlit run app.py` server and drives concurrent headless
+sessions against it, reporting throughput, latency percentiles, memory per
+session and the saturation point.
+
+Usage:
+    python -m benchmarks.loadtest [--levels 1,2,4,8,16] [--sessions 4] [--latency 0.5]
+
+Each session opens the app's websocket (/_stcore/stream) the way a browser
+tab does, types a URL into the input box and clicks Generate by sending
+widget states as Streamlit BackMsg protobufs, then waits for the
+"Generation Complete" status. All users share the one server process, so
+the numbers are per server. Nothing leaves the machine: pages are served by
+a local HTML server, and the google-genai SDK is pointed at a local fake
+Gemini backend through GOOGLE_GEMINI_BASE_URL.
+
+Memory per session is measured separately in this process with Streamlit's
+AppTest and tracemalloc, since a running server's allocations can't be
+attributed to one session from outside.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import aiohttp
+
+from config.prompts import POSTS_JSON_SCHEMA
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / "app.py")
+
+# Seconds to wait for `streamlit run` to answer its health check
+SERVER_START_TIMEOUT = 60.0
+
+# Real spend limits would throttle or reject the fake load; they are cleared
+BUDGET_SETTINGS = (
+    "XAMPLIFY_SESSION_MAX_TOKENS",
+    "XAMPLIFY_SESSION_MAX_COST",
+    "XAMPLIFY_BUDGET_ACTION",
+    "XAMPLIFY_DOWNGRADE_MODEL",
+)
+
+# A level is saturated once adding users grows throughput by less than this
+SATURATION_GAIN = 0.10
+
+
+def _fake_posts() -> dict[str, str]:
+    """Valid posts for every required format (no em dashes, has line breaks)."""
+    return {
+        key: f"Short {key.replace('_', ' ')} line.\n\nSecond line with the point.\n\nThird line."
+        for key in POSTS_JSON_SCHEMA["required"]
+    }
+
+
+def make_gemini_handler(latency: float):
+    """Request handler mimicking the generateContent REST endpoint."""
+    posts_text = json.dumps(_fake_posts())
+
+    class FakeGeminiHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            time.sleep(latency)
+
+            config = body.get("generationConfig", {})
+            if config.get("responseMimeType") == "application/json":
+                text = posts_text
+            else:
+                text = "Most teams ship slower because they measure the wrong thing."
+
+            payload = json.dumps({
+                "candidates": [{
+                    "content": {"role": "model", "parts": [{"text": text}]},
+                    "finishReason": "STOP",
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": len(json.dumps(body)) // 4,
+                    "candidatesTokenCount": len(text) // 4,
+                    "totalTokenCount": (len(json.dumps(body)) + len(text)) // 4,
+                },
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return FakeGeminiHandler
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    """Serves a synthetic article page for every path."""
+
+    PAGE = (
+        "<html><head><title>Article</title></head><body>"
+        "<nav>" + "".join(f'<a href="/n{i}">Nav link {i}</a>' for i in range(30)) + "</nav>"
+        "<article><h1>Why measurement beats intuition</h1>"
+        + "".join(
+            f"<p>Paragraph {i}: teams that measure outcomes, not output, ship faster, "
+            "learn sooner, and waste less effort on work nobody needed.</p>"
+            for i in range(40)
+        )
+        + "</article><footer>Footer text</footer></body></html>"
+    ).encode()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(self.PAGE)))
+        self.end_headers()
+        self.wfile.write(self.PAGE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handler) -> ThreadingHTTPServer:
+    """Start a threaded HTTP server on a free local port."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_app_server(env: dict[str, str], secrets_file: str) -> tuple[subprocess.Popen, str]:
+    """
+    Start `streamlit run app.py` headless on a free local port.
+
+    Secrets are read only from `secrets_file`, not the project's
+    .streamlit/secrets.toml.
+
+    Returns:
+        (process, base URL) once the server answers its health check
+
+    Raises:
+        RuntimeError: If the server exits or doesn't come up in time
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "streamlit", "run", APP_PATH,
+            "--server.headless", "true",
+            "--server.address", "127.0.0.1",
+            "--server.port", str(port),
+            "--server.fileWatcherType", "none",
+            "--browser.gatherUsageStats", "false",
+            "--secrets.files", secrets_file,
+        ],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base = f"http://127.0.0.1:{port}"
+    give_up = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < give_up:
+        if process.poll() is not None:
+            raise RuntimeError(f"streamlit exited with code {process.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return process, base
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"streamlit did not start within {SERVER_START_TIMEOUT:.0f}s")
+
+
+class BrowserSession:
+    """
+    A headless app session speaking Streamlit's websocket protocol.
+
+    Widgets are found by type and label in the deltas of the last run, and
+    every rerun sends the full set of widget values, like the frontend does.
+    """
+
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse, timeout: float):
+        self.ws = ws
+        self.timeout = timeout
+        self.deltas: list = []
+
+    async def rerun(self, widget_states: list | None = None) -> None:
+        """Request a script run with the given widget states and wait for it to finish."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        message = BackMsg()
+        message.rerun_script.query_string = ""
+        message.rerun_script.widget_states.widgets.extend(widget_states or [])
+        await self.ws.send_bytes(message.SerializeToString())
+
+        self.deltas = []
+        await asyncio.wait_for(self._receive_run(), self.timeout)
+
+    async def _receive_run(self) -> None:
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        while True:
+            frame = await self.ws.receive()
+            if frame.type != aiohttp.WSMsgType.BINARY:
+                raise RuntimeError(f"Websocket closed during run ({frame.type.name})")
+            forward = ForwardMsg()
+            forward.ParseFromString(frame.data)
+            kind = forward.WhichOneof("type")
+            if kind == "delta":
+                self.deltas.append(forward.delta)
+            elif kind == "script_finished":
+                status = forward.script_finished
+                if status == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise RuntimeError("App failed to compile")
+                if status != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return
+
+    def element(self, kind: str, label_prefix: str = ""):
+        """The first element of `kind` whose label starts with `label_prefix`."""
+        for delta in self.deltas:
+            if delta.new_element.WhichOneof("type") != kind:
+                continue
+            element = getattr(delta.new_element, kind)
+            if element.label.startswith(label_prefix):
+                return element
+        raise RuntimeError(f"No {kind} labelled '{label_prefix}' in the page")
+
+    def status_labels(self) -> list[str]:
+        return [
+            delta.add_block.expandable.label
+            for delta in self.deltas
+            if delta.add_block.WhichOneof("type") == "expandable"
+        ]
+
+    def errors(self) -> list[str]:
+        from streamlit.proto.Alert_pb2 import Alert
+
+        messages = []
+        for delta in self.deltas:
+            element = delta.new_element
+            if element.WhichOneof("type") == "exception":
+                messages.append(element.exception.message)
+            elif element.WhichOneof("type") == "alert" and element.alert.format == Alert.ERROR:
+                messages.append(element.alert.body)
+        return messages
+
+
+async def run_browser_session(http: aiohttp.ClientSession, base: str, url: str, timeout: float) -> float:
+    """
+    Run one user session against the server and return its generation latency.
+
+    Raises:
+        RuntimeError: If the run errored or never reported completion
+    """
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    ws_url = base.replace("http", "ws", 1) + "/_stcore/stream"
+    async with http.ws_connect(ws_url, protocols=("streamlit",), max_msg_size=0) as ws:
+        session = BrowserSession(ws, timeout)
+        await session.rerun()
+        text_input = WidgetState(id=session.element("text_area", "Input").id, string_value=url)
+        await session.rerun([text_input])
+        generate = WidgetState(id=session.element("button", "⚡ Generate").id, trigger_value=True)
+
+        start = time.perf_counter()
+        await session.rerun([text_input, generate])
+        latency = time.perf_counter() - start
+
+    if session.errors():
+        raise RuntimeError(session.errors()[0])
+    if not any("Generation Complete" in label for label in session.status_labels()):
+        raise RuntimeError("Run finished without completing generation")
+    return latency
+
+
+def run_session(url: str, timeout: float):
+    """
+    Run one in-process AppTest session and return (latency, app_test).
+
+    Raises:
+        RuntimeError: If the run raised or produced no posts
+    """
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    # Non-empty AppTest secrets replace the project's secrets.toml entirely
+    at.secrets["GEMINI_API_KEY"] = os.environ["GEMINI_API_KEY"]
+    at.run()
+    at.text_area[0].input(url).run()
+    generate = next(button for button in at.button if button.label.startswith("⚡ Generate"))
+
+    start = time.perf_counter()
+    generate.click().run()
+    latency = time.perf_counter() - start
+
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    if "run_id" not in at.session_state:
+        errors = [element.value for element in at.error]
+        raise RuntimeError(f"No posts generated: {errors}")
+    return latency, at
+
+
+def measure_session_memory(url: str, timeout: float) -> float:
+    """Bytes retained by one idle session after a full generation."""
+    run_session(url, timeout)  # warm imports and caches
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    _, at = run_session(url, timeout)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del at
+    return retained
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def user_sessions(
+    http: aiohttp.ClientSession, base: str, url: str, sessions: int, timeout: float
+) -> tuple[list[float], list[str]]:
+    """One simulated user: run sessions back to back, return (latencies, errors)."""
+    latencies: list[float] = []
+    errors: list[str] = []
+    for _ in range(sessions):
+        try:
+            latencies.append(await run_browser_session(http, base, url, timeout))
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+    return latencies, errors
+
+
+async def run_level(base: str, url: str, users: int, sessions_per_user: int, timeout: float) -> dict:
+    """Run `users` concurrent users against one server, each completing `sessions_per_user` sessions."""
+    latencies: list[float] = []
+    errors: list[str] = []
+
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        start = time.perf_counter()
+        results = await asyncio.gather(*(
+            user_sessions(http, base, url, sessions_per_user, timeout) for _ in range(users)
+        ))
+        elapsed = time.perf_counter() - start
+
+    for user_latencies, user_errors in results:
+        latencies.extend(user_latencies)
+        errors.extend(user_errors)
+
+    return {
+        "users": users,
+        "completed": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50) if latencies else None,
+        "p95": percentile(latencies, 95) if latencies else None,
+        "p99": percentile(latencies, 99) if latencies else None,
+    }
+
+
+def find_saturation(results: list[dict]) -> dict | None:
+    """Return the last level before throughput stopped growing meaningfully."""
+    for previous, current in zip(results, results[1:]):
+        if current["throughput"] < previous["throughput"] * (1 + SATURATION_GAIN):
+            return previous
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the X-Amplify Streamlit app.")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated concurrent user counts")
+    parser.add_argument("--sessions", type=int, default=4, help="Sessions each user runs per level")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake Gemini latency per call (s)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-run timeout (s)")
+    args = parser.parse_args()
+
+    # Silence per-run Streamlit warnings so the report stays readable
+    from streamlit.logger import set_log_level
+    set_log_level("error")
+
+    gemini = start_server(make_gemini_handler(args.latency))
+    pages = start_server(ArticleHandler)
+    url = f"http://127.0.0.1:{pages.server_port}/article"
+
+    # Keep load-test runs out of the real history store and away from real budgets
+    workdir = tempfile.TemporaryDirectory(prefix="xamplify-loadtest-")
+    os.environ["XAMPLIFY_HISTORY_PATH"] = os.path.join(workdir.name, "history.sqlite3")
+    for name in BUDGET_SETTINGS:
+        os.environ.pop(name, None)
+    os.environ["GOOGLE_GEMINI_BASE_URL"] = f"http://127.0.0.1:{gemini.server_port}/"
+    os.environ.setdefault("GEMINI_API_KEY", "load-test-key")
+    secrets_file = os.path.join(workdir.name, "secrets.toml")
+    with open(secrets_file, "w", encoding="utf-8") as fp:
+        fp.write(f"GEMINI_API_KEY = {json.dumps(os.environ['GEMINI_API_KEY'])}\n")
+
+    memory = measure_session_memory(url, args.timeout)
+    print(f"Memory per session: {memory / 1024:.0f} KiB retained after one generation")
+
+    server, base = start_app_server(dict(os.environ), secrets_file)
+    try:
+        # One untimed session so server start-up and first imports aren't counted
+        asyncio.run(run_level(base, url, 1, 1, args.timeout))
+
+        print(f"{'users':>5} {'done':>5} {'errors':>6} {'sess/s':>7} {'p50 s':>6} {'p95 s':>6} {'p99 s':>6}")
+        results = []
+        for users in (int(level) for level in args.levels.split(",")):
+            result = asyncio.run(run_level(base, url, users, args.sessions, args.timeout))
+            results.append(result)
+            fmt = lambda value: f"{value:>6.2f}" if value is not None else f"{'-':>6}"
+            print(f"{users:>5} {result['completed']:>5} {result['errors']:>6} "
+                  f"{result['throughput']:>7.2f} {fmt(result['p50'])} {fmt(result['p95'])} {fmt(result['p99'])}")
+            if result["first_error"]:
+                print(f"      first error: {result['first_error']}")
+    finally:
+        server.terminate()
+        server.wait()
+        workdir.cleanup()
+
+    saturated = find_saturation(results)
+    if saturated:
+        print(f"Saturation: throughput stops scaling beyond {saturated['users']} concurrent users "
+              f"({saturated['throughput']:.2f} sessions/s)")
+    else:
+        print("Saturation: not reached at the tested levels")
+
+
+if __name__ == "__main__":
+    main()
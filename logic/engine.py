@@ -5,6 +5,8 @@ Handles all interactions with Gemini 3 Pro via google-genai SDK.
 
 import os
 import json
+import time
+from collections import Counter
 from google import genai
 from google.genai import types
 
@@ -14,6 +16,46 @@ from config.prompts import (
     POSTS_JSON_SCHEMA,
 )
 from logic.validator import validate_all_posts, has_critical_issues
+from logic.resilience import CircuitBreaker, hedged_call
+from logic.usage import Budget, UsageLedger, UsageRecord, record_from_response
+
+DEFAULT_MODEL = "gemini-3-flash-preview"
+FALLBACK_MODEL = "gemini-2.5-flash"
+
+# Per-call deadline in seconds
+DEFAULT_DEADLINE = 60.0
+
+# Hedge after the observed p95 latency, but never sooner than this
+MIN_HEDGE_DELAY = 2.0
+HEDGE_MIN_SAMPLES = 5
+
+# p95 latency (seconds) per step above which the primary model's breaker trips;
+# formats calls produce ~40x the output of thesis calls
+STEP_LATENCY_LIMITS = {"thesis": 15.0, "formats": 45.0}
+
+# Process-wide state, shared by every engine instance (one per generation run).
+# Breakers are shared across engine instances so every session benefits from
+# what the others have observed. Model calls themselves all run on the fixed
+# pool in logic.resilience (XAMPLIFY_MODEL_WORKERS, default 16), which caps
+# concurrent model calls process-wide, hedged duplicates included.
+_breakers: dict[str, CircuitBreaker] = {}
+_metrics: Counter = Counter()
+_usage = UsageLedger()
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    """Return the shared circuit breaker (and per-step latency windows) for a model."""
+    return _breakers.setdefault(model, CircuitBreaker(latency_limits=STEP_LATENCY_LIMITS))
+
+
+def get_metrics() -> dict[str, int]:
+    """Snapshot of process-wide model call counters."""
+    return dict(_metrics)
+
+
+def get_usage_report() -> dict:
+    """Aggregated token and cost usage across all sessions in this process."""
+    return _usage.report()
 
 
 def get_api_key() -> str:
@@ -42,43 +84,207 @@ def get_api_key() -> str:
 class GeminiEngine:
     """Handles Gemini 3 Pro API interactions."""
     
-    def __init__(self):
-        """Initialize the Gemini client."""
+    def __init__(
+        self,
+        model: str = DEFAULT_MODEL,
+        fallback_model: str | None = FALLBACK_MODEL,
+        deadline: float = DEFAULT_DEADLINE,
+        hedge: bool = True,
+        usage: UsageLedger | None = None,
+        budget: Budget | None = None,
+    ):
+        """
+        Initialize the Gemini client.
+        
+        Args:
+            model: Primary model
+            fallback_model: Model used while the primary's circuit breaker is open
+            deadline: Default per-call deadline in seconds
+            hedge: Fire a duplicate request once a call runs past the p95 latency
+            usage: Session ledger to record token usage into (a fresh one if omitted)
+            budget: Session budget checked before every call
+        """
         api_key = get_api_key()
         
-        self.client = genai.Client(api_key=api_key)
-        self.model = "gemini-3-flash-preview"
+        self.client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=int(deadline * 1000)),
+        )
+        self.model = model
+        self.fallback_model = fallback_model
+        self.deadline = deadline
+        self.hedge = hedge
+        self.last_model = model
+        self.counters: Counter = Counter()
+        self.usage = usage if usage is not None else UsageLedger()
+        self.budget = budget
+    
+    def _count(self, counters: Counter) -> None:
+        """Add events to both this engine's and the process-wide counters."""
+        self.counters.update(counters)
+        _metrics.update(counters)
+    
+    def _hedge_delay(self, model: str, step: str) -> float | None:
+        """Derive the hedge delay from the model's recent p95 latency for this step."""
+        if not self.hedge:
+            return None
+        latency = get_breaker(model).latency(step)
+        if len(latency) < HEDGE_MIN_SAMPLES:
+            return None
+        return max(MIN_HEDGE_DELAY, latency.percentile(95))
+    
+    def _record_outcome(
+        self,
+        breaker: CircuitBreaker | None,
+        model: str,
+        step: str,
+        success: bool,
+        seconds: float | None,
+    ) -> bool:
+        """
+        Feed a call's outcome to its breaker, or just its latency when unguarded.
+        
+        `seconds` is None when the call never reached the model (it timed
+        out waiting for a worker); that says nothing about the model, so the
+        breaker's allow() is handed back instead.
+        
+        Returns:
+            True if the outcome tripped the breaker open
+        """
+        if seconds is None:
+            if breaker is not None:
+                breaker.release()
+            return False
+        if breaker is None:
+            get_breaker(model).latency(step).record(seconds)
+            return False
+        return breaker.record(success, seconds, step)
     
-    def extract_thesis(self, content: str) -> str:
+    def _generate(
+        self,
+        contents: str,
+        config: types.GenerateContentConfig,
+        deadline: float | None = None,
+        step: str = "generate",
+        attempt: int = 0,
+    ):
+        """
+        Call the model with a deadline, hedging and circuit-breaker fallback.
+        
+        Token usage is recorded against `step` and `attempt` in the session
+        ledger and the process-wide ledger, including attempts whose response
+        was not used (losing hedges, late completions) and failed attempts.
+        
+        Raises:
+            DeadlineExceeded: If the call does not finish within the deadline
+            BudgetExceeded: If the session budget is spent and set to reject
+        """
+        deadline = deadline or self.deadline
+        
+        model = self.model
+        events = Counter(calls=1)
+        if self.budget:
+            model = self.budget.route(self.usage, model)
+            if model != self.model:
+                events["budget_downgrades"] += 1
+        
+        # The breaker only guards calls to the primary model, and only when
+        # there is somewhere to fall back to; every allow() that lets a call
+        # through is paired with a record() below.
+        breaker = None
+        if model == self.model and self.fallback_model:
+            breaker = get_breaker(model)
+            if not breaker.allow():
+                breaker = None
+                model = self.fallback_model
+                events["fallback_calls"] += 1
+        self.last_model = model
+        
+        # Latency is measured from when a worker starts an attempt, not from
+        # submission, so queueing in the shared pool isn't blamed on the model
+        started: list[float] = []
+        
+        def call():
+            start = time.monotonic()
+            started.append(start)
+            response = self.client.models.generate_content(
+                model=model,
+                contents=contents,
+                config=config,
+            )
+            return response, time.monotonic() - start
+        
+        try:
+            response, seconds = hedged_call(
+                call,
+                deadline,
+                self._hedge_delay(model, step),
+                events,
+                lambda future: self._record_discarded(future, step, model, attempt),
+            )
+        except Exception:
+            events["errors"] += 1
+            seconds = time.monotonic() - started[0] if started else None
+            if self._record_outcome(breaker, model, step, False, seconds):
+                events["breaker_opened"] += 1
+            self._count(events)
+            raise
+        
+        self._record_outcome(breaker, model, step, True, seconds)
+        self._count(events)
+        
+        self._add_usage(record_from_response(response, step, model, attempt))
+        return response
+    
+    def _add_usage(self, record: UsageRecord) -> None:
+        self.usage.add(record)
+        _usage.add(record)
+    
+    def _record_discarded(self, future, step: str, model: str, attempt: int) -> None:
+        """Account for an attempt hedged_call did not return (it may still have been billed)."""
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            self._add_usage(UsageRecord(step, model, attempt, 0, 0, 0, 0.0, outcome="failed"))
+        else:
+            response, _ = future.result()
+            self._add_usage(record_from_response(response, step, model, attempt, "discarded"))
+    
+    def extract_thesis(self, content: str, deadline: float | None = None) -> str:
         """
         Step 1: Extract the Core Value Proposition from input content.
         
         Args:
             content: The raw content (from URL or direct text)
+            deadline: Per-call deadline in seconds (defaults to the engine's)
             
         Returns:
             The distilled thesis statement
         """
         prompt = THESIS_EXTRACTION_PROMPT.format(input_content=content)
         
-        response = self.client.models.generate_content(
-            model=self.model,
-            contents=prompt,
-            config=types.GenerateContentConfig(
+        response = self._generate(
+            prompt,
+            types.GenerateContentConfig(
                 temperature=0.7,
                 max_output_tokens=100,
             ),
+            deadline,
+            step="thesis",
         )
         
         return response.text.strip()
     
-    def generate_all_formats(self, thesis: str, max_retries: int = 2) -> dict[str, str]:
+    def generate_all_formats(
+        self, thesis: str, max_retries: int = 2, deadline: float | None = None
+    ) -> dict[str, str]:
         """
         Step 2: Generate all 10 Stijn formats from the thesis.
         
         Args:
             thesis: The core value proposition
             max_retries: Number of retries if validation fails
+            deadline: Per-attempt deadline in seconds (defaults to the engine's)
             
         Returns:
             Dictionary with all 10 post formats
@@ -86,15 +292,17 @@ class GeminiEngine:
         prompt = STIJN_METHOD_PROMPT.format(thesis=thesis)
         
         for attempt in range(max_retries + 1):
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config=types.GenerateContentConfig(
+            response = self._generate(
+                prompt,
+                types.GenerateContentConfig(
                     temperature=0.8,
                     max_output_tokens=4000,
                     response_mime_type="application/json",
                     response_schema=POSTS_JSON_SCHEMA,
                 ),
+                deadline,
+                step="formats",
+                attempt=attempt,
             )
             
             try:
@@ -121,6 +329,8 @@ class GeminiEngine:
                 # Convert \n strings to actual newlines for display
                 for key in posts:
                     posts[key] = posts[key].replace('\\n', '\n')
+                self.usage.add_posts(len(posts))
+                _usage.add_posts(len(posts))
                 return posts
             
             # Add retry context to prompt
@@ -0,0 +1,198 @@
+"""
+Bulk Export
+Streams stored runs to JSONL or a columnar file (Parquet, CSV fallback) in
+fixed-size chunks, so memory stays constant however many posts are exported.
+"""
+
+import csv
+import json
+import os
+from typing import IO, Iterable, Iterator
+
+from logic.history import HistoryStore, StoredRun
+from logic.validator import validate_post
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# Rows buffered before each columnar write
+DEFAULT_CHUNK_SIZE = 10_000
+
+# One row per generated post
+POST_COLUMNS = [
+    "run_id",
+    "session_id",
+    "created",
+    "thesis",
+    "format",
+    "content",
+    "char_count",
+    "is_valid",
+    "issues",
+    "thesis_seconds",
+    "formats_seconds",
+]
+
+
+def run_to_record(run: StoredRun) -> dict:
+    """Nested JSON record for one run, including validation per post."""
+    validation = {}
+    for key, content in run.posts.items():
+        result = validate_post(content)
+        validation[key] = {"is_valid": result.is_valid, "issues": result.issues}
+    return {
+        "run_id": run.run_id,
+        "session_id": run.session_id,
+        "created": run.created,
+        "thesis": run.thesis,
+        "posts": run.posts,
+        "validation": validation,
+        "timings": run.timings,
+    }
+
+
+def iter_post_rows(runs: Iterable[StoredRun]) -> Iterator[dict]:
+    """Flatten runs into one row per post with POST_COLUMNS keys."""
+    for run in runs:
+        for key, content in run.posts.items():
+            result = validate_post(content)
+            yield {
+                "run_id": run.run_id,
+                "session_id": run.session_id,
+                "created": run.created,
+                "thesis": run.thesis,
+                "format": key,
+                "content": content,
+                "char_count": len(content),
+                "is_valid": result.is_valid,
+                "issues": "; ".join(result.issues),
+                "thesis_seconds": run.timings.get("thesis"),
+                "formats_seconds": run.timings.get("formats"),
+            }
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_jsonl(runs: Iterable[StoredRun], fp: IO[str]) -> int:
+    """Write one JSON line per run; returns the number of runs written."""
+    count = 0
+    for run in runs:
+        fp.write(json.dumps(run_to_record(run), ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[dict], fp: IO[str]) -> int:
+    """Write post rows as CSV; returns the number of rows written."""
+    writer = csv.DictWriter(fp, fieldnames=POST_COLUMNS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def write_parquet(rows: Iterable[dict], path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Write post rows to Parquet, one row group per chunk.
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    if pa is None:
+        raise ImportError("pyarrow is required for Parquet export (pip install pyarrow)")
+
+    schema = pa.schema([
+        ("run_id", pa.string()),
+        ("session_id", pa.string()),
+        ("created", pa.float64()),
+        ("thesis", pa.string()),
+        ("format", pa.string()),
+        ("content", pa.string()),
+        ("char_count", pa.int32()),
+        ("is_valid", pa.bool_()),
+        ("issues", pa.string()),
+        ("thesis_seconds", pa.float64()),
+        ("formats_seconds", pa.float64()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in _chunks(rows, chunk_size):
+            writer.write_batch(pa.RecordBatch.from_pylist(chunk, schema=schema))
+            count += len(chunk)
+    return count
+
+
+def export_runs(
+    store: HistoryStore,
+    path: str,
+    fmt: str = "parquet",
+    since: float | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> tuple[str, int]:
+    """
+    Export stored runs to `path`.
+
+    Args:
+        store: History store to read from
+        path: Output file path
+        fmt: "jsonl", "parquet" or "csv". Parquet falls back to CSV (with a
+            .csv suffix) when pyarrow is not installed.
+        since: Only export runs created at or after this Unix timestamp
+        chunk_size: Rows fetched from the store and written per chunk
+
+    Returns:
+        (path written, number of records) where records are runs for JSONL
+        and posts for the columnar formats
+    """
+    runs = store.iter_runs(since=since, chunk_size=chunk_size)
+
+    if fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as fp:
+            return (path, write_jsonl(runs, fp))
+
+    if fmt == "parquet" and pa is not None:
+        return (path, write_parquet(iter_post_rows(runs), path, chunk_size))
+
+    if fmt == "parquet":
+        path = os.path.splitext(path)[0] + ".csv"
+    elif fmt != "csv":
+        raise ValueError(f"Unknown export format '{fmt}'. Use jsonl, parquet or csv.")
+
+    with open(path, "w", encoding="utf-8", newline="") as fp:
+        return (path, write_csv(iter_post_rows(runs), fp))
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk export generated runs.")
+    parser.add_argument("out", help="Output file path")
+    parser.add_argument("--format", choices=["jsonl", "parquet", "csv"], default="parquet")
+    parser.add_argument("--since", type=float, default=None, help="Unix timestamp lower bound")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--history", default=None, help="History store path")
+    args = parser.parse_args()
+
+    path, count = export_runs(
+        HistoryStore(args.history), args.out, args.format, args.since, args.chunk_size
+    )
+    print(f"Wrote {count} records to {path}")
+
+
+if __name__ == "__main__":
+    main()
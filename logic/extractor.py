@@ -0,0 +1,229 @@
+"""
+Main Content Extractor
+Pluggable engines that pull the main text block out of an HTML page.
+"""
+
+import re
+from typing import Callable
+
+from bs4 import BeautifulSoup, Comment
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+
+# Tags that never hold readable content
+NOISE_TAGS = ['script', 'style', 'noscript', 'template', 'svg', 'iframe']
+
+# Forms are kept (ASP.NET WebForms wraps the whole page in one); only
+# search, login and signup widgets are dropped, by action, role, class or id
+CHROME_FORM_HINTS = re.compile(
+    r'search|login|log-in|signin|sign-in|signup|sign-up|register|subscribe|newsletter|comment',
+    re.IGNORECASE,
+)
+
+# Tags stripped by the legacy selector chain
+LEGACY_NOISE_TAGS = ['script', 'style', 'nav', 'header', 'footer', 'aside']
+
+# Elements that can own a run of text for density scoring
+BLOCK_TAGS = {
+    'p', 'div', 'td', 'li', 'pre', 'blockquote', 'section', 'article', 'main',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'dd', 'figcaption', 'body',
+}
+
+# Elements that never win, even if they contain a lot of text
+BOILERPLATE_TAGS = {'nav', 'header', 'footer', 'aside', 'menu'}
+
+NEGATIVE_HINTS = re.compile(
+    r'comment|footer|sidebar|menu|nav|banner|share|social|related|promo|cookie|subscribe|ad-',
+    re.IGNORECASE,
+)
+POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|post|story|text', re.IGNORECASE)
+
+# Text runs shorter than this are treated as chrome (buttons, labels, bylines)
+MIN_TEXT_RUN = 25
+
+
+def make_soup(html: str | bytes) -> BeautifulSoup:
+    """Parse HTML with the fastest available parser."""
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+def _select_main_text(soup: BeautifulSoup) -> str:
+    for element in soup(LEGACY_NOISE_TAGS):
+        element.decompose()
+
+    main_content = None
+
+    # Priority: article > main > body
+    for selector in ['article', 'main', '[role="main"]', '.post-content', '.article-body']:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+
+    if not main_content:
+        main_content = soup.body if soup.body else soup
+
+    return main_content.get_text(separator='\n', strip=True)
+
+
+def selector_extractor(html: str | bytes) -> str:
+    """
+    Legacy extractor: strip chrome tags and try a fixed list of selectors.
+
+    Parses with html.parser exactly as it always has, so benchmarks compare
+    against the original engine.
+    """
+    return _select_main_text(BeautifulSoup(html, 'html.parser'))
+
+
+def selector_lxml_extractor(html: str | bytes) -> str:
+    """The legacy selector chain on the fastest available parser."""
+    return _select_main_text(make_soup(html))
+
+
+def _is_chrome_form(form) -> bool:
+    """True for search/login/signup forms rather than page-wrapping ones."""
+    if form.get('role') == 'search' or form.find('input', attrs={'type': 'password'}):
+        return True
+    attrs = " ".join([
+        " ".join(form.get('class') or []),
+        form.get('id') or "",
+        form.get('action') or "",
+    ])
+    return bool(CHROME_FORM_HINTS.search(attrs))
+
+
+def _hint_weight(element) -> float:
+    """Score multiplier from an element's tag name, class and id."""
+    if element.name in BOILERPLATE_TAGS:
+        return 0.0
+
+    attrs = " ".join(element.get('class') or []) + " " + (element.get('id') or "")
+    weight = 1.0
+    if element.name in ('article', 'main') or element.get('role') == 'main':
+        weight *= 1.5
+    if attrs.strip():
+        if NEGATIVE_HINTS.search(attrs):
+            weight *= 0.2
+        if POSITIVE_HINTS.search(attrs):
+            weight *= 1.25
+    return weight
+
+
+def density_extractor(html: str | bytes) -> str:
+    """
+    Find the main content block by text density and link density.
+
+    Each text node is credited to its nearest block ancestor in a single walk
+    over the tree, while text and link character counts accumulate on every
+    enclosing block. Block scores then flow up to the parent (full) and
+    grandparent (half), so the container holding the most prose wins over
+    both a lone paragraph and the whole body.
+    """
+    soup = make_soup(html)
+
+    for element in soup(NOISE_TAGS):
+        element.decompose()
+    for form in soup('form'):
+        if _is_chrome_form(form):
+            form.decompose()
+
+    text_chars: dict[int, int] = {}
+    link_chars: dict[int, int] = {}
+    own_score: dict[int, float] = {}
+    nodes: dict[int, object] = {}
+
+    for string in soup.find_all(string=True):
+        if isinstance(string, Comment):
+            continue
+        length = len(string.strip())
+        if not length:
+            continue
+
+        ancestors = list(string.parents)
+        in_link = any(parent.name == 'a' for parent in ancestors)
+        block = None
+        for parent in ancestors:
+            if parent.name not in BLOCK_TAGS:
+                continue
+            if block is None:
+                block = parent
+            key = id(parent)
+            nodes[key] = parent
+            text_chars[key] = text_chars.get(key, 0) + length
+            if in_link:
+                link_chars[key] = link_chars.get(key, 0) + length
+        if block is None:
+            continue
+
+        key = id(block)
+        if not in_link and length >= MIN_TEXT_RUN:
+            # Commas are a cheap signal of running prose
+            own_score[key] = own_score.get(key, 0.0) + 1 + length / 100 + string.count(',')
+
+    scores: dict[int, float] = {}
+    for key, score in own_score.items():
+        block = nodes[key]
+        for depth, ancestor in enumerate([block, block.parent, getattr(block.parent, 'parent', None)]):
+            if ancestor is None or ancestor.name not in BLOCK_TAGS:
+                continue
+            ancestor_key = id(ancestor)
+            nodes[ancestor_key] = ancestor
+            scores[ancestor_key] = scores.get(ancestor_key, 0.0) + score / (depth or 1)
+
+    best, best_score = None, 0.0
+    for key, score in scores.items():
+        element = nodes[key]
+        total = text_chars.get(key, 0)
+        links = link_chars.get(key, 0)
+        link_density = links / total if total else 0.0
+        final = score * (1 - link_density) * _hint_weight(element)
+        if final > best_score:
+            best, best_score = element, final
+
+    if best is None:
+        best = soup.body if soup.body else soup
+
+    for element in best.find_all(BOILERPLATE_TAGS):
+        element.decompose()
+
+    text = best.get_text(separator='\n', strip=True)
+    if not text:
+        # Nothing survived scoring and cleanup; the selector chain is more lenient
+        return selector_extractor(html)
+    return text
+
+
+EXTRACTORS: dict[str, Callable[[str | bytes], str]] = {
+    "density": density_extractor,
+    "selector": selector_extractor,
+    "selector-lxml": selector_lxml_extractor,
+}
+
+DEFAULT_EXTRACTOR = "density"
+
+
+def get_extractor(name: str | None = None) -> Callable[[str | bytes], str]:
+    """
+    Look up an extractor engine by name.
+
+    Args:
+        name: Registered extractor name, or None for the default
+
+    Returns:
+        A callable taking raw HTML and returning the main text
+
+    Raises:
+        ValueError: If the name is not registered
+    """
+    name = name or DEFAULT_EXTRACTOR
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown extractor '{name}'. Available: {', '.join(sorted(EXTRACTORS))}"
+        )
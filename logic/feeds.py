@@ -0,0 +1,497 @@
+"""
+Feed Ingestor
+Polls RSS/Atom feeds and sitemaps and yields only new or changed entries.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable, Iterable, Iterator, NamedTuple
+from xml.etree import ElementTree
+
+import requests
+
+from logic.scraper import HEADERS, fetch_html, extract_text_from_html, scrape_urls
+
+DEFAULT_INDEX_PATH = ".x_amplify_feeds.sqlite3"
+
+# Failed entries are retried after RETRY_BASE_DELAY * 2**(failures - 1)
+# seconds (capped at RETRY_MAX_DELAY) and given up on after MAX_ENTRY_FAILURES
+# until the feed shows a new `updated` stamp for them
+RETRY_BASE_DELAY = 900
+RETRY_MAX_DELAY = 86400
+MAX_ENTRY_FAILURES = 5
+
+
+class FeedEntry(NamedTuple):
+    """A link discovered in a feed or sitemap."""
+    url: str
+    updated: str | None
+
+
+class IngestedItem(NamedTuple):
+    """An entry whose extracted text is new or has changed."""
+    url: str
+    text: str
+    content_hash: str
+    updated: str | None = None
+
+
+def _local(tag: str) -> str:
+    """Strip the XML namespace from a tag name."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _child_text(element, name: str) -> str | None:
+    for child in element:
+        if _local(child.tag) == name and child.text:
+            return child.text.strip()
+    return None
+
+
+def _permalink_guid(item) -> str | None:
+    """An RSS item's guid, if it is a permalink (the default) rather than an opaque id."""
+    for child in item:
+        if _local(child.tag) == "guid" and child.text:
+            if child.get("isPermaLink", "true").lower() == "false":
+                return None
+            return child.text.strip()
+    return None
+
+
+def parse_feed(xml: bytes) -> tuple[str, list[FeedEntry]]:
+    """
+    Parse RSS 2.0, Atom or sitemap XML.
+
+    Returns:
+        (kind, entries) where kind is the root tag ("rss", "feed", "urlset"
+        or "sitemapindex"). Sitemap index entries are child sitemap URLs.
+    """
+    root = ElementTree.fromstring(xml)
+    kind = _local(root.tag)
+    entries = []
+
+    if kind == "rss":
+        for item in root.iter():
+            if _local(item.tag) == "item":
+                link = _child_text(item, "link") or _permalink_guid(item)
+                if link:
+                    entries.append(FeedEntry(link, _child_text(item, "pubDate")))
+    elif kind == "feed":
+        for entry in root:
+            if _local(entry.tag) != "entry":
+                continue
+            link = None
+            for child in entry:
+                if _local(child.tag) == "link" and child.get("rel", "alternate") == "alternate":
+                    link = child.get("href")
+                    break
+            if link:
+                entries.append(FeedEntry(
+                    link, _child_text(entry, "updated") or _child_text(entry, "published")
+                ))
+    elif kind in ("urlset", "sitemapindex"):
+        for node in root:
+            loc = _child_text(node, "loc")
+            if loc:
+                entries.append(FeedEntry(loc, _child_text(node, "lastmod")))
+    else:
+        raise ValueError(f"Unsupported feed format: <{kind}>")
+
+    return (kind, entries)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SeenIndex:
+    """
+    SQLite index of feed validators and processed entries.
+
+    Stores ETag/Last-Modified per feed for conditional GETs (plus the
+    sitemap `<lastmod>` it was last polled at), the child sitemaps of each
+    sitemap index, and the `updated` stamp plus extracted-text hash per
+    entry along with its failure count and next retry time.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or os.getenv("XAMPLIFY_FEED_INDEX_PATH") or DEFAULT_INDEX_PATH
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS feeds (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "url TEXT PRIMARY KEY, updated TEXT, content_hash TEXT, seen_at REAL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sitemap_children ("
+                "index_url TEXT, url TEXT, lastmod TEXT, PRIMARY KEY (index_url, url))"
+            )
+            self._add_columns("feeds", {"lastmod": "TEXT"})
+            self._add_columns(
+                "entries", {"failures": "INTEGER DEFAULT 0", "retry_at": "REAL", "retry_updated": "TEXT"}
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_retry ON entries (retry_at)")
+
+    def _add_columns(self, table: str, columns: dict[str, str]) -> None:
+        existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+        for name, kind in columns.items():
+            if name not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+
+    def feed_validators(self, feed_url: str) -> tuple[str | None, str | None]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM feeds WHERE url = ?", (feed_url,)
+            ).fetchone()
+        return row if row else (None, None)
+
+    def feed_lastmod(self, feed_url: str) -> str | None:
+        """The sitemap `<lastmod>` a feed was last fully polled at, if any."""
+        with self._lock:
+            row = self._conn.execute("SELECT lastmod FROM feeds WHERE url = ?", (feed_url,)).fetchone()
+        return row[0] if row else None
+
+    def save_feed_validators(
+        self, feed_url: str, etag: str | None, last_modified: str | None, lastmod: str | None = None
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (url, etag, last_modified, lastmod) VALUES (?, ?, ?, ?)",
+                (feed_url, etag, last_modified, lastmod),
+            )
+
+    def sitemap_children(self, index_url: str) -> list[FeedEntry]:
+        """Child sitemaps last seen in a sitemap index, as (url, lastmod)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, lastmod FROM sitemap_children WHERE index_url = ?", (index_url,)
+            ).fetchall()
+        return [FeedEntry(url, lastmod) for url, lastmod in rows]
+
+    def save_sitemap_children(self, index_url: str, children: list[FeedEntry]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sitemap_children WHERE index_url = ?", (index_url,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sitemap_children (index_url, url, lastmod) VALUES (?, ?, ?)",
+                [(index_url, child.url, child.updated) for child in children],
+            )
+
+    def entry(self, url: str) -> tuple[str | None, str | None] | None:
+        """Return (updated, content_hash) for a known entry, or None."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT updated, content_hash FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+
+    def mark(self, url: str, updated: str | None, text_hash: str | None) -> None:
+        """Record an entry as processed, clearing any failures."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(url, updated, content_hash, seen_at, failures, retry_at, retry_updated) "
+                "VALUES (?, ?, ?, ?, 0, NULL, NULL)",
+                (url, updated, text_hash, time.time()),
+            )
+
+    def mark_failed(self, url: str, updated: str | None) -> int:
+        """
+        Record a failed attempt at an entry and schedule its retry.
+
+        The last successful `updated` stamp and hash are kept; the stamp that
+        failed is stored for the retry. Returns the consecutive failure count.
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT failures, retry_updated FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+            failures = 1
+            if row and row[1] == updated:
+                failures = (row[0] or 0) + 1
+            retry_at = None
+            if failures < MAX_ENTRY_FAILURES:
+                retry_at = now + min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (failures - 1))
+            if row:
+                self._conn.execute(
+                    "UPDATE entries SET failures = ?, retry_at = ?, retry_updated = ?, seen_at = ? "
+                    "WHERE url = ?",
+                    (failures, retry_at, updated, now, url),
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO entries (url, seen_at, failures, retry_at, retry_updated) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (url, now, failures, retry_at, updated),
+                )
+        return failures
+
+    def backing_off(self, url: str, updated: str | None, now: float) -> bool:
+        """True if `url` failed with this `updated` stamp and isn't due for a retry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT failures, retry_at, retry_updated FROM entries WHERE url = ?", (url,)
+            ).fetchone()
+        if not row or not row[0] or row[2] != updated:
+            return False
+        return row[1] is None or row[1] > now
+
+    def due_retries(self, now: float) -> list[FeedEntry]:
+        """Failed entries whose retry time has come, with the stamp that failed."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, retry_updated FROM entries WHERE retry_at <= ?", (now,)
+            ).fetchall()
+        return [FeedEntry(url, updated) for url, updated in rows]
+
+
+def fetch_feed(feed_url: str, index: SeenIndex) -> tuple[bytes | None, tuple[str | None, str | None]]:
+    """
+    Conditionally GET a feed using the validators stored in `index`.
+
+    The new validators are returned rather than saved: they should only be
+    stored at the end of a polling cycle, once the feed's entries have been
+    processed or recorded as failed, or a 304 on the next poll would hide them.
+
+    Returns:
+        (body, (etag, last_modified)), where body is None if the server
+        answered 304 Not Modified
+
+    Raises:
+        Exception: If the request fails
+    """
+    etag, last_modified = index.feed_validators(feed_url)
+    headers = dict(HEADERS)
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    try:
+        response = requests.get(feed_url, headers=headers, timeout=10)
+        if response.status_code == 304:
+            return (None, (etag, last_modified))
+        response.raise_for_status()
+    except requests.RequestException as e:
+        raise Exception(f"Failed to fetch feed: {str(e)}")
+
+    return (response.content, (response.headers.get("ETag"), response.headers.get("Last-Modified")))
+
+
+def _print_error(url: str, error: Exception) -> None:
+    print(f"Failed to ingest {url}: {type(error).__name__}: {error}", file=sys.stderr, flush=True)
+
+
+class FeedIngestor:
+    """
+    Polls feeds and yields entries whose extracted text is new or changed.
+
+    Known entries whose feed `updated` stamp is unchanged (or absent) are
+    skipped without a fetch. The rest are scraped; if the extracted text
+    hashes the same as last time, the entry is recorded but not yielded.
+    Changed entries are only recorded once `mark_processed` is called for
+    them. Entries that fail to scrape or aren't marked are retried with
+    exponential backoff, even if their feed answers 304 from then on.
+    Child sitemaps of a sitemap index are polled even when the index itself
+    is unchanged, unless their `<lastmod>` says they haven't changed.
+    """
+
+    def __init__(
+        self,
+        feeds: Iterable[str],
+        index: SeenIndex | None = None,
+        extractor: str | None = None,
+        process_workers: int | None = None,
+    ):
+        self.feeds = list(feeds)
+        self.index = index or SeenIndex()
+        self.extractor = extractor
+        self.process_workers = process_workers
+        self._processed: set[str] = set()
+
+    def candidates(
+        self,
+        errors: list | None = None,
+        validators: dict[str, tuple[str | None, str | None, str | None]] | None = None,
+    ) -> Iterator[FeedEntry]:
+        """
+        Entries to scrape this cycle: new ones, ones with a new `updated`
+        stamp, and failed ones that are due for a retry.
+
+        Feeds that fail to fetch or parse are skipped and, if `errors` is
+        given, appended to it as (feed_url, exception). If `validators` is
+        given, it collects (etag, last_modified, lastmod) per polled feed
+        for saving at the end of the cycle.
+        """
+        validators = validators if validators is not None else {}
+        now = time.time()
+        pending = [FeedEntry(url, None) for url in self.feeds]
+        polled = set()
+        yielded = set()
+        while pending:
+            feed_url, lastmod = pending.pop(0)
+            if feed_url in polled:
+                continue
+            polled.add(feed_url)
+            if lastmod and self.index.feed_lastmod(feed_url) == lastmod:
+                # Child sitemap unchanged since it was last polled
+                continue
+
+            try:
+                xml, (etag, last_modified) = fetch_feed(feed_url, self.index)
+                kind, entries = parse_feed(xml) if xml is not None else (None, [])
+            except Exception as e:
+                if errors is not None:
+                    errors.append((feed_url, e))
+                continue
+            validators[feed_url] = (etag, last_modified, lastmod)
+
+            if kind == "sitemapindex":
+                self.index.save_sitemap_children(feed_url, entries)
+            if kind in ("sitemapindex", None):
+                # Child sitemaps change while their index stays the same, so
+                # they are polled even when the index answers 304
+                pending.extend(self.index.sitemap_children(feed_url))
+                continue
+
+            for entry in entries:
+                known = self.index.entry(entry.url)
+                if known and known[1] is not None and (entry.updated is None or known[0] == entry.updated):
+                    continue
+                if entry.url in yielded or self.index.backing_off(entry.url, entry.updated, now):
+                    continue
+                yielded.add(entry.url)
+                yield entry
+
+        for entry in self.index.due_retries(now):
+            if entry.url not in yielded:
+                yielded.add(entry.url)
+                yield entry
+
+    def mark_processed(self, item: IngestedItem) -> None:
+        """Record an item as handled so it isn't yielded again until it changes."""
+        self.index.mark(item.url, item.updated, item.content_hash)
+        self._processed.add(item.url)
+
+    def poll(self) -> Iterator[IngestedItem | tuple[str, Exception]]:
+        """
+        Run one polling cycle.
+
+        With `process_workers` set, pages are scraped through the process
+        pool (see scrape_urls); otherwise one at a time in this thread.
+        Call `mark_processed` for each item once it has been handled; items
+        that aren't marked are recorded as failed and retried later. Feed
+        validators are saved once the generator is exhausted.
+
+        Yields:
+            IngestedItem for new/changed content, or (url, exception) on failure
+        """
+        errors: list[tuple[str, Exception]] = []
+        validators: dict[str, tuple[str | None, str | None, str | None]] = {}
+        entries = {entry.url: entry for entry in self.candidates(errors, validators)}
+        yield from errors
+
+        if self.process_workers:
+            outcomes = scrape_urls(entries, self.extractor, self.process_workers)
+        else:
+            outcomes = self._scrape_serially(entries)
+
+        yielded = []
+        for url, outcome in outcomes:
+            entry = entries[url]
+            if isinstance(outcome, Exception):
+                self.index.mark_failed(url, entry.updated)
+                yield (url, outcome)
+                continue
+            text_hash = content_hash(outcome)
+            known = self.index.entry(url)
+            if known and known[1] == text_hash:
+                # Same text under a new `updated` stamp: nothing to handle
+                self.index.mark(url, entry.updated, text_hash)
+                continue
+            yielded.append(entry)
+            yield IngestedItem(url, outcome, text_hash, entry.updated)
+
+        # Reached only after the consumer has handled every item
+        for entry in yielded:
+            if entry.url not in self._processed:
+                self.index.mark_failed(entry.url, entry.updated)
+            self._processed.discard(entry.url)
+        for feed_url, (etag, last_modified, lastmod) in validators.items():
+            self.index.save_feed_validators(feed_url, etag, last_modified, lastmod)
+
+    def _scrape_serially(self, urls: Iterable[str]) -> Iterator[tuple[str, str | Exception]]:
+        for url in urls:
+            try:
+                yield (url, extract_text_from_html(fetch_html(url), self.extractor))
+            except Exception as e:
+                yield (url, e)
+
+    def run(
+        self,
+        handle: Callable[[IngestedItem], None],
+        interval: float,
+        cycles: int | None = None,
+        on_error: Callable[[str, Exception], None] | None = None,
+    ) -> None:
+        """
+        Poll every `interval` seconds, passing new items to `handle`.
+
+        An item is marked processed only once `handle` returns. Fetch,
+        scrape and `handle` failures are passed to `on_error` (printed to
+        stderr by default) and retried on the next cycle.
+        """
+        report = on_error or _print_error
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            for item in self.poll():
+                if not isinstance(item, IngestedItem):
+                    report(*item)
+                    continue
+                try:
+                    handle(item)
+                except Exception as e:
+                    report(item.url, e)
+                    continue
+                self.mark_processed(item)
+            cycle += 1
+            if cycles is None or cycle < cycles:
+                time.sleep(interval)
+
+
+def main():
+    """Poll feeds and generate posts for new or changed entries as JSON lines."""
+    import argparse
+    from dotenv import load_dotenv
+    from logic.engine import GeminiEngine
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Ingest feeds into the X-Amplify pipeline.")
+    parser.add_argument("feeds", nargs="+", help="RSS/Atom feed or sitemap URLs")
+    parser.add_argument("--interval", type=float, default=900, help="Seconds between polls")
+    parser.add_argument("--once", action="store_true", help="Run a single polling cycle")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes")
+    args = parser.parse_args()
+
+    engine = GeminiEngine()
+
+    def handle(item: IngestedItem) -> None:
+        thesis = engine.extract_thesis(item.text)
+        posts = engine.generate_all_formats(thesis)
+        print(json.dumps({"url": item.url, "thesis": thesis, "posts": posts}, ensure_ascii=False), flush=True)
+
+    FeedIngestor(args.feeds, process_workers=args.workers).run(
+        handle, args.interval, cycles=1 if args.once else None
+    )
+
+
+if __name__ == "__main__":
+    main()
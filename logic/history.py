@@ -0,0 +1,202 @@
+"""
+History Store
+Persists generated runs to SQLite so sessions don't have to hold them in memory.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Iterator, NamedTuple
+
+DEFAULT_HISTORY_PATH = ".x_amplify_history.sqlite3"
+
+# Oldest runs beyond this count are pruned on save (XAMPLIFY_HISTORY_MAX_RUNS)
+DEFAULT_MAX_RUNS = 10_000
+
+
+class StoredRun(NamedTuple):
+    """A generated run as persisted in the history store."""
+    run_id: str
+    session_id: str
+    created: float
+    thesis: str
+    posts: dict[str, str]
+    timings: dict[str, float]
+
+
+class HistoryStore:
+    """
+    Thread-safe SQLite store of generated runs (thesis + posts).
+
+    Retention is enforced on every save: runs beyond the newest `max_runs`,
+    or older than `max_age` seconds, are deleted. Both default from the
+    XAMPLIFY_HISTORY_MAX_RUNS and XAMPLIFY_HISTORY_MAX_AGE_DAYS settings;
+    0 disables a limit.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_runs: int | None = None,
+        max_age: float | None = None,
+    ):
+        self.path = path or os.getenv("XAMPLIFY_HISTORY_PATH") or DEFAULT_HISTORY_PATH
+        if max_runs is None:
+            max_runs = int(os.getenv("XAMPLIFY_HISTORY_MAX_RUNS") or DEFAULT_MAX_RUNS)
+        if max_age is None:
+            max_age = float(os.getenv("XAMPLIFY_HISTORY_MAX_AGE_DAYS") or 0) * 86400
+        self.max_runs = max_runs
+        self.max_age = max_age
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                "id TEXT PRIMARY KEY, session_id TEXT, created REAL, thesis TEXT, posts TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS runs_session ON runs (session_id, created)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS runs_created ON runs (created)")
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(runs)")}
+            if "timings" not in columns:
+                self._conn.execute("ALTER TABLE runs ADD COLUMN timings TEXT")
+
+    def save(
+        self,
+        session_id: str,
+        thesis: str,
+        posts: dict[str, str],
+        timings: dict[str, float] | None = None,
+    ) -> str:
+        """Store a run (with optional step timings in seconds) and return its id."""
+        run_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (id, session_id, created, thesis, posts, timings) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    run_id,
+                    session_id,
+                    now,
+                    thesis,
+                    json.dumps(posts, ensure_ascii=False),
+                    json.dumps(timings or {}),
+                ),
+            )
+            self._prune(now)
+        return run_id
+
+    def _prune(self, now: float) -> None:
+        """Apply the retention limits. Caller holds the lock and transaction."""
+        if self.max_age:
+            self._conn.execute("DELETE FROM runs WHERE created < ?", (now - self.max_age,))
+        if self.max_runs:
+            self._conn.execute(
+                "DELETE FROM runs WHERE created < ("
+                "SELECT created FROM runs ORDER BY created DESC LIMIT 1 OFFSET ?)",
+                (self.max_runs - 1,),
+            )
+
+    def load(self, run_id: str) -> tuple[str, dict[str, str]] | None:
+        """Return (thesis, posts) for a run, or None if it is unknown."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT thesis, posts FROM runs WHERE id = ?", (run_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return (row[0], json.loads(row[1]))
+
+    def recent(self, session_id: str, limit: int = 10) -> list[tuple[str, float, str]]:
+        """Return (run_id, created, thesis) for a session's latest runs."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, created, thesis FROM runs WHERE session_id = ? "
+                "ORDER BY created DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+
+    def iter_runs(self, since: float | None = None, chunk_size: int = 1000) -> Iterator[StoredRun]:
+        """
+        Stream stored runs oldest first, fetching `chunk_size` rows at a time.
+
+        Uses its own connection so a long export doesn't hold the store lock.
+        """
+        conn = sqlite3.connect(self.path)
+        try:
+            cursor = conn.execute(
+                "SELECT id, session_id, created, thesis, posts, timings FROM runs "
+                "WHERE created >= ? ORDER BY created",
+                (since or 0,),
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for run_id, session_id, created, thesis, posts, timings in rows:
+                    yield StoredRun(
+                        run_id, session_id, created, thesis,
+                        json.loads(posts), json.loads(timings) if timings else {},
+                    )
+        finally:
+            conn.close()
+
+
+class PayloadCache:
+    """
+    Process-wide cache of each session's latest results, with a TTL.
+
+    Sessions keep only a run id; the thesis and posts live here so that
+    `sweep()` can drop them for every session, including idle ones that
+    never rerun. Dropped results are still in the history store.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[float, str, str, dict[str, str]]] = {}
+        self._lock = threading.Lock()
+        self._sweeper: threading.Thread | None = None
+
+    def put(self, session_id: str, run_id: str, thesis: str, posts: dict[str, str]) -> None:
+        with self._lock:
+            self._entries[session_id] = (time.time(), run_id, thesis, posts)
+
+    def get(self, session_id: str, run_id: str) -> tuple[str, dict[str, str]] | None:
+        """Return (thesis, posts) if the session's cached results are for `run_id`."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+        if entry is None or entry[1] != run_id:
+            return None
+        return (entry[2], entry[3])
+
+    def pop(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def sweep(self) -> int:
+        """Drop results older than the TTL; returns how many were dropped."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry[0] < cutoff]
+            for key in stale:
+                del self._entries[key]
+        return len(stale)
+
+    def start_sweeper(self, interval: float) -> None:
+        """Sweep every `interval` seconds on a daemon thread (idempotent)."""
+        if self._sweeper is not None:
+            return
+
+        def loop() -> None:
+            while True:
+                time.sleep(interval)
+                self.sweep()
+
+        self._sweeper = threading.Thread(target=loop, name="xamp-payload-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def __len__(self) -> int:
+        return len(self._entries)
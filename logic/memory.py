@@ -0,0 +1,89 @@
+"""
+Memory Accounting
+Estimates per-session memory and exposes optional tracemalloc snapshots.
+"""
+
+import sys
+import threading
+import tracemalloc
+from collections import deque
+
+# tracemalloc is process-wide, so sessions share it: it runs while at least
+# one session has asked for it, and only if this module was the one to start it
+_tracing_owners: set[str] = set()
+_tracing_started_here = False
+_tracing_lock = threading.Lock()
+
+
+def deep_sizeof(obj, _seen: set[int] | None = None) -> int:
+    """
+    Approximate bytes held by an object graph of builtin containers.
+
+    Objects exposing `__dict__` are followed through their attributes; each
+    object is counted once even if referenced from several places.
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__") and not isinstance(obj, type):
+        size += deep_sizeof(vars(obj), seen)
+    return size
+
+
+def session_memory(state) -> dict[str, int]:
+    """Approximate bytes per key of a session-state mapping, largest first."""
+    sizes = {str(key): deep_sizeof(state[key]) for key in list(state.keys())}
+    return dict(sorted(sizes.items(), key=lambda item: item[1], reverse=True))
+
+
+def start_tracing(owner: str) -> None:
+    """
+    Register `owner` (e.g. a session id) as wanting allocation tracing.
+
+    Starts tracemalloc when the first owner registers, unless something
+    else already started it. Calling again for the same owner is a no-op.
+    """
+    global _tracing_started_here
+    with _tracing_lock:
+        if owner in _tracing_owners:
+            return
+        _tracing_owners.add(owner)
+        if len(_tracing_owners) == 1 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracing_started_here = True
+
+
+def stop_tracing(owner: str) -> None:
+    """
+    Drop `owner`'s request for tracing.
+
+    Stops tracemalloc when the last owner leaves, and only if start_tracing
+    started it; tracing begun elsewhere in the process is left running.
+    """
+    global _tracing_started_here
+    with _tracing_lock:
+        if owner not in _tracing_owners:
+            return
+        _tracing_owners.discard(owner)
+        if not _tracing_owners and _tracing_started_here:
+            _tracing_started_here = False
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+
+
+def top_allocations(limit: int = 10) -> list[str]:
+    """Top allocation sites by size from a fresh tracemalloc snapshot."""
+    if not tracemalloc.is_tracing():
+        return []
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    return [str(stat) for stat in snapshot.statistics("lineno")[:limit]]
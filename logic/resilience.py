@@ -0,0 +1,244 @@
+"""
+Resilience Helpers
+Deadlines, hedged requests and a circuit breaker for model calls.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not finish within its deadline."""
+
+
+class LatencyTracker:
+    """Rolling window of call latencies (seconds) for percentile estimates."""
+
+    def __init__(self, window: int = 50):
+        self._samples: deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the given percentile, or None if there are no samples yet."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * pct / 100))
+        return samples[index]
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+
+class CircuitBreaker:
+    """
+    Trips when the recent error rate or p95 latency crosses a threshold.
+
+    Latency is tracked per step (e.g. "thesis" vs "formats"), since calls of
+    very different sizes share a model; `latency_limits` overrides the p95
+    threshold for individual steps.
+
+    While open, callers should route to a fallback. After `cooldown` seconds
+    the breaker goes half-open and lets a single trial call through; a
+    success closes it, a failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        error_rate: float = 0.5,
+        latency_p95: float = 20.0,
+        window: int = 20,
+        min_calls: int = 5,
+        cooldown: float = 30.0,
+        latency_limits: dict[str, float] | None = None,
+    ):
+        self.error_rate = error_rate
+        self.latency_p95 = latency_p95
+        self.latency_limits = dict(latency_limits or {})
+        self.window = window
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._latencies: dict[str, LatencyTracker] = {}
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def latency(self, step: str = "generate") -> LatencyTracker:
+        """The latency window for one step, created on first use."""
+        with self._lock:
+            return self._latencies.setdefault(step, LatencyTracker(self.window))
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.cooldown:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return True if a call may go to the protected model."""
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self) -> None:
+        """Give back an allow() whose call never reached the model (no outcome to record)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record(self, success: bool, seconds: float | None = None, step: str = "generate") -> bool:
+        """
+        Record a call outcome, with the seconds the model took for `step`.
+
+        Returns:
+            True if this outcome tripped the breaker open
+        """
+        latency = self.latency(step)
+        if seconds is not None:
+            latency.record(seconds)
+
+        with self._lock:
+            if self._opened_at is not None:
+                if not self._trial_in_flight:
+                    # A straggler from before the breaker tripped
+                    return False
+                self._trial_in_flight = False
+                if success:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                else:
+                    self._opened_at = time.monotonic()
+                return False
+
+            self._outcomes.append(success)
+            if len(self._outcomes) < self.min_calls:
+                return False
+
+            failures = self._outcomes.count(False) / len(self._outcomes)
+            p95 = latency.percentile(95) if len(latency) >= self.min_calls else None
+            limit = self.latency_limits.get(step, self.latency_p95)
+            if failures >= self.error_rate or (p95 is not None and p95 >= limit):
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+
+# Runs every model call in the process, hedges included, so its size is the
+# process-wide cap on concurrent model calls (XAMPLIFY_MODEL_WORKERS)
+MODEL_WORKERS = int(os.getenv("XAMPLIFY_MODEL_WORKERS") or 16)
+_executor = ThreadPoolExecutor(max_workers=MODEL_WORKERS, thread_name_prefix="xamp-model")
+
+
+def hedged_call(
+    fn: Callable[[], T],
+    deadline: float,
+    hedge_delay: float | None,
+    counters: Counter,
+    on_discarded: Callable[[Future], None] | None = None,
+) -> T:
+    """
+    Run `fn` with a deadline, firing one duplicate after `hedge_delay`.
+
+    Whichever attempt finishes first wins. If the first attempt fails before
+    the hedge has fired, the hedge is fired immediately instead.
+
+    The deadline and hedge delay run from when a worker starts the first
+    attempt, so time queued behind other calls in the shared pool isn't
+    charged to the model. Waiting for a worker is bounded by the deadline
+    too; a call that never starts is cancelled and counted as a queue timeout.
+
+    Args:
+        fn: Zero-argument callable performing the request
+        deadline: Seconds allowed for the call once it has started (and
+            separately, for it to start)
+        hedge_delay: Seconds to wait before hedging, or None to disable
+        counters: Counter updated with hedge and timeout events
+        on_discarded: Called with every attempt whose outcome is not returned
+            (losing hedges, failures, completions after the deadline) once it
+            finishes or is cancelled
+
+    Raises:
+        DeadlineExceeded: If no attempt completes within the deadline
+    """
+    started = threading.Event()
+
+    def run_primary() -> T:
+        started.set()
+        return fn()
+
+    primary = _executor.submit(run_primary)
+    submitted = [primary]
+    if not started.wait(deadline) and primary.cancel():
+        counters["queue_timeouts"] += 1
+        _discard(submitted, None, on_discarded)
+        raise DeadlineExceeded(f"No model worker free within the {deadline:.1f}s deadline")
+
+    start = time.monotonic()
+    pending: set[Future] = {primary}
+    hedged = hedge_delay is None
+    last_error: BaseException | None = None
+
+    while pending:
+        elapsed = time.monotonic() - start
+        remaining = deadline - elapsed
+        if remaining <= 0:
+            break
+        wait_for = remaining if hedged else min(remaining, max(0.0, hedge_delay - elapsed))
+        done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            error = future.exception()
+            if error is None:
+                if future is not primary:
+                    counters["hedge_wins"] += 1
+                _discard(submitted, future, on_discarded)
+                return future.result()
+            last_error = error
+
+        if not hedged and (done or time.monotonic() - start >= hedge_delay):
+            hedged = True
+            counters["hedges_fired"] += 1
+            hedge = _executor.submit(fn)
+            submitted.append(hedge)
+            pending.add(hedge)
+
+    _discard(submitted, None, on_discarded)
+    if pending:
+        counters["timeouts"] += 1
+        for future in pending:
+            future.cancel()
+        raise DeadlineExceeded(f"Model call exceeded {deadline:.1f}s deadline")
+
+    raise last_error
+
+
+def _discard(
+    submitted: list[Future], winner: Future | None, on_discarded: Callable[[Future], None] | None
+) -> None:
+    if on_discarded is None:
+        return
+    for future in submitted:
+        if future is not winner:
+            future.add_done_callback(on_discarded)
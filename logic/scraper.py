@@ -3,11 +3,24 @@ URL Content Scraper
 Extracts main text content from web pages using BeautifulSoup4.
 """
 
+import os
+import queue
+import threading
 import requests
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, Iterator
 from urllib.parse import urlparse
 import re
 
+from logic.extractor import get_extractor
+
+# Limit content length (for token efficiency)
+MAX_CONTENT_CHARS = 8000
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
 
 def is_valid_url(text: str) -> bool:
     """Check if the input string is a valid URL."""
@@ -18,60 +31,156 @@ def is_valid_url(text: str) -> bool:
         return False
 
 
-def extract_content_from_url(url: str) -> str:
+def clean_text(text: str, max_chars: int = MAX_CONTENT_CHARS) -> str:
+    """Collapse excessive whitespace and truncate to the token budget."""
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    text = re.sub(r' {2,}', ' ', text)
+    
+    if len(text) > max_chars:
+        text = text[:max_chars] + "..."
+    
+    return text
+
+
+def extract_text_from_html(html: str | bytes, extractor: str | None = None) -> str:
     """
-    Scrape a URL and extract the main text content.
+    Extract and clean the main text content from raw HTML.
     
     Args:
-        url: The URL to scrape
+        html: The page markup
+        extractor: Name of the extractor engine (defaults to density scoring)
         
     Returns:
-        Extracted text content from the page
-        
+        Cleaned main text content
+
     Raises:
-        Exception: If scraping fails
+        Exception: If no readable text was found
+    """
+    text = clean_text(get_extractor(extractor)(html))
+    if not text:
+        raise Exception("No readable content found on the page")
+    return text
+
+
+def fetch_html(url: str) -> bytes:
     """
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
+    Download a page and return its raw bytes (no parsing).
     
+    Raises:
+        Exception: If the request fails
+    """
     try:
-        response = requests.get(url.strip(), headers=headers, timeout=10)
+        response = requests.get(url.strip(), headers=HEADERS, timeout=10)
         response.raise_for_status()
     except requests.RequestException as e:
         raise Exception(f"Failed to fetch URL: {str(e)}")
     
-    soup = BeautifulSoup(response.text, 'html.parser')
-    
-    # Remove script and style elements
-    for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-        element.decompose()
-    
-    # Try to find main content areas
-    main_content = None
+    return response.content
+
+
+def extract_content_from_url(url: str, extractor: str | None = None) -> str:
+    """
+    Scrape a URL and extract the main text content.
     
-    # Priority: article > main > body
-    for selector in ['article', 'main', '[role="main"]', '.post-content', '.article-body']:
-        main_content = soup.select_one(selector)
-        if main_content:
-            break
+    Args:
+        url: The URL to scrape
+        extractor: Name of the extractor engine (defaults to density scoring)
+        
+    Returns:
+        Extracted text content from the page
+        
+    Raises:
+        Exception: If scraping fails
+    """
+    return extract_text_from_html(fetch_html(url), extractor)
+
+
+_BATCH_DONE = object()
+
+
+def scrape_urls(
+    urls: Iterable[str],
+    extractor: str | None = None,
+    process_workers: int | None = None,
+    fetch_workers: int = 8,
+    max_pending: int | None = None,
+) -> Iterator[tuple[str, str | Exception]]:
+    """
+    Scrape many URLs, downloading on threads and parsing in a process pool.
     
-    if not main_content:
-        main_content = soup.body if soup.body else soup
+    Parsing is CPU-bound and holds the GIL, so raw page bytes are handed to
+    worker processes which return only the extracted text. At most
+    `max_pending` pages are in flight (downloading, waiting to parse, or
+    parsed but not yet consumed), so memory stays bounded when downloads
+    outrun parsing or the caller consumes slowly.
     
-    # Extract text
-    text = main_content.get_text(separator='\n', strip=True)
+    Must be called from under an `if __name__ == "__main__":` guard on
+    platforms that spawn worker processes.
     
-    # Clean up excessive whitespace
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r' {2,}', ' ', text)
+    Args:
+        urls: URLs to scrape (may be a lazy iterable)
+        extractor: Name of the extractor engine (defaults to density scoring)
+        process_workers: Parser processes (defaults to the CPU count)
+        fetch_workers: Download threads
+        max_pending: In-flight page limit (defaults to 2x process_workers)
+        
+    Yields:
+        (url, text) on success or (url, exception) on failure, in completion order
+    """
+    process_workers = process_workers or os.cpu_count() or 1
+    max_pending = max_pending or process_workers * 2
     
-    # Limit content length (for token efficiency)
-    max_chars = 8000
-    if len(text) > max_chars:
-        text = text[:max_chars] + "..."
+    slots = threading.Semaphore(max_pending)
+    results: queue.Queue = queue.Queue()
+    stop = threading.Event()
     
-    return text
+    with ThreadPoolExecutor(fetch_workers) as fetch_pool, \
+            ProcessPoolExecutor(process_workers) as parse_pool:
+        
+        def fetch_and_parse(url: str) -> None:
+            try:
+                raw = fetch_html(url)
+                future = parse_pool.submit(extract_text_from_html, raw, extractor)
+            except Exception as e:
+                results.put((url, e))
+                return
+            future.add_done_callback(
+                lambda f: results.put((url, f.exception() or f.result()))
+            )
+        
+        def feed() -> None:
+            submitted = 0
+            try:
+                for url in urls:
+                    slots.acquire()
+                    if stop.is_set():
+                        break
+                    fetch_pool.submit(fetch_and_parse, url)
+                    submitted += 1
+            finally:
+                results.put((_BATCH_DONE, submitted))
+        
+        feeder = threading.Thread(target=feed, name="scrape-feeder", daemon=True)
+        feeder.start()
+        
+        total = None
+        received = 0
+        try:
+            while total is None or received < total:
+                url, outcome = results.get()
+                if url is _BATCH_DONE:
+                    total = outcome
+                    continue
+                received += 1
+                slots.release()
+                yield (url, outcome)
+        finally:
+            # Unblock the feeder if the caller stopped early
+            stop.set()
+            for _ in range(max_pending):
+                slots.release()
+            fetch_pool.shutdown(wait=True, cancel_futures=True)
+            parse_pool.shutdown(wait=True, cancel_futures=True)
 
 
 def smart_input_parser(user_input: str) -> tuple[str, str]:
@@ -0,0 +1,210 @@
+"""
+Token Usage & Budgets
+Records per-call token counts and cost, and enforces per-session budgets.
+"""
+
+import os
+import threading
+from collections import deque
+from typing import NamedTuple
+
+# USD per 1M tokens: (input, output, cached input). Update when pricing changes.
+MODEL_PRICING = {
+    "gemini-3-flash-preview": (0.50, 3.00, 0.05),
+    "gemini-2.5-flash": (0.30, 2.50, 0.03),
+    "gemini-2.5-flash-lite": (0.10, 0.40, 0.01),
+}
+
+# Keep only the most recent per-call records; totals are tracked separately
+MAX_RECORDS = 200
+
+
+class BudgetExceeded(Exception):
+    """Raised when a session budget rejects a model call."""
+
+
+class UsageRecord(NamedTuple):
+    """
+    Token usage of a single model call attempt.
+
+    `outcome` is "used" for the response the caller got, "discarded" for a
+    billed response nobody used (a losing hedge, or one that finished after
+    the deadline) and "failed" for an attempt that raised.
+    """
+    step: str
+    model: str
+    attempt: int
+    prompt_tokens: int
+    output_tokens: int
+    cached_tokens: int
+    cost: float
+    outcome: str = "used"
+
+
+def estimate_cost(model: str, prompt_tokens: int, output_tokens: int, cached_tokens: int) -> float:
+    """Estimate the USD cost of a call. Unknown models are priced at zero."""
+    input_price, output_price, cached_price = MODEL_PRICING.get(model, (0.0, 0.0, 0.0))
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (
+        uncached * input_price
+        + cached_tokens * cached_price
+        + output_tokens * output_price
+    ) / 1_000_000
+
+
+def record_from_response(
+    response, step: str, model: str, attempt: int, outcome: str = "used"
+) -> UsageRecord:
+    """Build a UsageRecord from a google-genai response's usage_metadata."""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or 0
+    cached_tokens = getattr(usage, "cached_content_token_count", None) or 0
+    # Thinking tokens are billed as output
+    output_tokens = (
+        (getattr(usage, "candidates_token_count", None) or 0)
+        + (getattr(usage, "thoughts_token_count", None) or 0)
+    )
+    return UsageRecord(
+        step=step,
+        model=model,
+        attempt=attempt,
+        prompt_tokens=prompt_tokens,
+        output_tokens=output_tokens,
+        cached_tokens=cached_tokens,
+        cost=estimate_cost(model, prompt_tokens, output_tokens, cached_tokens),
+        outcome=outcome,
+    )
+
+
+class UsageLedger:
+    """Thread-safe token and cost totals for one session (or the process)."""
+
+    def __init__(self, max_records: int = MAX_RECORDS):
+        self.records: deque[UsageRecord] = deque(maxlen=max_records)
+        self.calls = 0
+        self.discarded_calls = 0
+        self.failed_calls = 0
+        self.prompt_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+        self.cost = 0.0
+        self.posts = 0
+        self.by_step: dict[str, dict[str, float]] = {}
+        self.by_model: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    def add(self, record: UsageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+            self.calls += 1
+            if record.outcome == "discarded":
+                self.discarded_calls += 1
+            elif record.outcome == "failed":
+                self.failed_calls += 1
+            self.prompt_tokens += record.prompt_tokens
+            self.output_tokens += record.output_tokens
+            self.cached_tokens += record.cached_tokens
+            self.cost += record.cost
+            for group, key in ((self.by_step, record.step), (self.by_model, record.model)):
+                totals = group.setdefault(key, {"calls": 0, "tokens": 0, "cost": 0.0})
+                totals["calls"] += 1
+                totals["tokens"] += record.prompt_tokens + record.output_tokens
+                totals["cost"] += record.cost
+
+    def add_posts(self, count: int) -> None:
+        with self._lock:
+            self.posts += count
+
+    def report(self) -> dict:
+        """Aggregated usage, including cost per generated post."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "discarded_calls": self.discarded_calls,
+                "failed_calls": self.failed_calls,
+                "prompt_tokens": self.prompt_tokens,
+                "output_tokens": self.output_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cost_usd": round(self.cost, 6),
+                "posts": self.posts,
+                "cost_per_post_usd": round(self.cost / self.posts, 6) if self.posts else None,
+                "by_step": {key: dict(value) for key, value in self.by_step.items()},
+                "by_model": {key: dict(value) for key, value in self.by_model.items()},
+            }
+
+
+class Budget(NamedTuple):
+    """
+    Per-session spend limits.
+
+    When a limit is reached, `action` is either "reject" (raise
+    BudgetExceeded) or "downgrade" (route calls to `downgrade_model`).
+    """
+    max_tokens: int | None = None
+    max_cost: float | None = None
+    action: str = "downgrade"
+    downgrade_model: str = "gemini-2.5-flash-lite"
+
+    def exceeded(self, ledger: UsageLedger) -> bool:
+        if self.max_tokens is not None and ledger.total_tokens >= self.max_tokens:
+            return True
+        if self.max_cost is not None and ledger.cost >= self.max_cost:
+            return True
+        return False
+
+    def route(self, ledger: UsageLedger, model: str) -> str:
+        """
+        Return the model a call should use under this budget.
+
+        Raises:
+            BudgetExceeded: If the budget is spent and the action is "reject"
+        """
+        if not self.exceeded(ledger):
+            return model
+        if self.action == "reject":
+            raise BudgetExceeded(
+                f"Session budget exceeded ({ledger.total_tokens} tokens, ${ledger.cost:.4f})"
+            )
+        return self.downgrade_model
+
+
+def _get_setting(name: str) -> str | None:
+    """Read a setting from Streamlit secrets (cloud) or environment (local)."""
+    try:
+        import streamlit as st
+        if hasattr(st, 'secrets') and name in st.secrets:
+            return str(st.secrets[name])
+    except Exception:
+        pass
+    return os.getenv(name)
+
+
+def get_budget() -> Budget | None:
+    """
+    Build the session budget from settings, or None if no limit is set.
+
+    Settings: XAMPLIFY_SESSION_MAX_TOKENS, XAMPLIFY_SESSION_MAX_COST,
+    XAMPLIFY_BUDGET_ACTION ("downgrade" or "reject"), XAMPLIFY_DOWNGRADE_MODEL.
+    """
+    max_tokens = _get_setting("XAMPLIFY_SESSION_MAX_TOKENS")
+    max_cost = _get_setting("XAMPLIFY_SESSION_MAX_COST")
+    if not max_tokens and not max_cost:
+        return None
+
+    action = _get_setting("XAMPLIFY_BUDGET_ACTION") or "downgrade"
+    if action not in ("downgrade", "reject"):
+        raise ValueError(f"XAMPLIFY_BUDGET_ACTION must be 'downgrade' or 'reject', got '{action}'")
+
+    budget = Budget(
+        max_tokens=int(max_tokens) if max_tokens else None,
+        max_cost=float(max_cost) if max_cost else None,
+        action=action,
+    )
+    downgrade_model = _get_setting("XAMPLIFY_DOWNGRADE_MODEL")
+    if downgrade_model:
+        budget = budget._replace(downgrade_model=downgrade_model)
+    return budget